@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+
+from cache import TTLCache
+from shared_cache import connect
+
+_SEPARATORS = re.compile(r"[,;\n]+|\s+and\s+|\s*&\s*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def symptom_terms(symptoms: str):
+    """Lowercased, whitespace-collapsed symptom phrases, de-duplicated in first-seen order
+
+    Phrases are split on commas, semicolons, newlines and "and" only; word
+    order inside a phrase is kept so "chest pain, back stiffness" and
+    "back pain, chest stiffness" stay distinct.
+    """
+    phrases = (_WHITESPACE.sub(" ", part).strip(" .") for part in _SEPARATORS.split(symptoms.lower()))
+    return list(dict.fromkeys(phrase for phrase in phrases if phrase))
+
+
+def normalize_symptoms(symptoms: str):
+    """Sorted symptom_terms, so the order they were listed in does not matter"""
+    return sorted(symptom_terms(symptoms))
+
+
+def analysis_key(symptoms: str, age_group: str, gender: str):
+    """Stable cache key for an analysis request; hashed so raw symptoms are never stored"""
+    normalized = "|".join([
+        _WHITESPACE.sub(" ", age_group.lower()).strip(),
+        _WHITESPACE.sub(" ", gender.lower()).strip(),
+        ",".join(normalize_symptoms(symptoms)),
+    ])
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """Two-tier analysis cache: in-memory LRU in front of a SQLite table that survives restarts
+
+    The SQLite tier is opened in WAL mode, so worker processes pointed at the
+    same file share each other's results. Reads use their own connection,
+    which WAL never makes wait for writers, so a lookup does not queue behind
+    a write or prune. Async code should use aget/aset/apreload, which touch
+    the memory tier on the event loop and SQLite only in a thread.
+    """
+
+    def __init__(self, path, ttl=6 * 3600, memory_size=5000, disk_rows=100000):
+        self.path = path
+        self.ttl = ttl
+        self.disk_rows = disk_rows
+        self.memory = TTLCache(maxsize=memory_size, ttl=ttl)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._db = None
+        self._reader = None
+        if path:
+            self._db = connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS analyses_expires_at ON analyses (expires_at)")
+            self._reader = connect(path)
+
+    def _read(self, sql, params):
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def _read_row(self, key):
+        rows = self._read("SELECT value, expires_at FROM analyses WHERE key = ? AND expires_at > ?", (key, time.time()))
+        return rows[0] if rows else None
+
+    def _promote(self, key, row):
+        if row is None:
+            self.misses += 1
+            return None
+        value = json.loads(row[0])
+        # Promote with whatever lifetime the disk entry has left
+        self.memory.set(key, value, ttl=row[1] - time.time())
+        self.disk_hits += 1
+        return value
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        return self._promote(key, self._read_row(key) if self._reader is not None else None)
+
+    async def aget(self, key):
+        """get() with the disk lookup run in a thread"""
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        row = await asyncio.to_thread(self._read_row, key) if self._reader is not None else None
+        return self._promote(key, row)
+
+    def set(self, key, value, ttl=None):
+        """Store value in both tiers; blocking on the disk write"""
+        ttl = self.ttl if ttl is None else ttl
+        self.memory.set(key, value, ttl=ttl)
+        self._write(key, value, ttl)
+
+    async def aset(self, key, value, ttl=None):
+        """set() with the disk write run in a thread"""
+        ttl = self.ttl if ttl is None else ttl
+        self.memory.set(key, value, ttl=ttl)
+        await asyncio.to_thread(self._write, key, value, ttl)
+
+    def _write(self, key, value, ttl):
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO analyses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl),
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                self._prune()
+
+    def _prune(self):
+        self._db.execute("DELETE FROM analyses WHERE expires_at <= ?", (time.time(),))
+        # Drop the entries closest to expiry once over the row cap
+        self._db.execute(
+            "DELETE FROM analyses WHERE key IN ("
+            "SELECT key FROM analyses ORDER BY expires_at LIMIT max(0, (SELECT count(*) FROM analyses) - ?))",
+            (self.disk_rows,),
+        )
+
+    def _preload_rows(self, limit):
+        if self._reader is None or limit <= 0:
+            return []
+        return self._read(
+            "SELECT key, value, expires_at FROM analyses WHERE expires_at > ? ORDER BY expires_at DESC LIMIT ?",
+            (time.time(), limit),
+        )
+
+    def preload(self, limit):
+        """Copy up to `limit` of the longest-lived disk entries into memory; blocking, returns the count"""
+        return self._fill(self._preload_rows(limit))
+
+    async def apreload(self, limit):
+        """preload() with the disk read run in a thread"""
+        return self._fill(await asyncio.to_thread(self._preload_rows, limit))
+
+    def _fill(self, rows):
+        now = time.time()
+        # Oldest first so the freshest entries end up most recently used
+        for key, value, expires_at in reversed(rows):
+            self.memory.set(key, json.loads(value), ttl=expires_at - now)
+        return len(rows)
+
+    def ttl_left(self, key):
+        """Seconds until the entry expires, or None if neither tier holds a live one; may block on disk
+
+        With a SQLite tier its expiry is the one that counts, as another
+        worker may have refreshed the entry since this one cached it.
+        """
+        if self._reader is not None:
+            rows = self._read("SELECT expires_at FROM analyses WHERE key = ?", (key,))
+            left = rows[0][0] - time.time() if rows else None
+        else:
+            left = self.memory.ttl_left(key)
+        return left if left is not None and left > 0 else None
+
+    def invalidate(self, key):
+        self.memory.invalidate(key)
+        if self._db is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM analyses WHERE key = ?", (key,))
+
+    def stats(self):
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_size": len(self.memory),
+        }
+
+    def close(self):
+        for db in (self._db, self._reader):
+            if db is not None:
+                db.close()
+        self._db = None
+        self._reader = None
@@ -0,0 +1,164 @@
+"""Local stand-ins for the GitHub and Gemini APIs, for load testing
+
+Usage (from backend/):
+    python benchmarks/fake_upstreams.py --port 9100 [--github-latency-ms 40] [--gemini-error-rate 0.02] ...
+
+GitHub is served under /github and Gemini under /gemini, so the app is
+pointed at them with GITHUB_API_URL=http://127.0.0.1:9100/github and
+GEMINI_API_URL=http://127.0.0.1:9100/gemini. Each upstream's latency is
+normal(mean, jitter) clipped at zero, with an optional share of slow
+(tail) responses and of 5xx errors.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+GEMINI_TEXT = (
+    "**Possible Diagnoses:**\n"
+    "1. Viral upper respiratory infection\n"
+    "2. Seasonal influenza\n"
+    "3. Allergic rhinitis\n\n"
+    "**Recommendations:**\n"
+    "1. Rest and drink plenty of fluids\n"
+    "2. Use over-the-counter medication for fever\n"
+    "3. Monitor your temperature twice a day\n"
+    "4. See a doctor if symptoms last more than a week\n"
+)
+
+GEMINI_JSON = json.dumps({
+    "diagnoses": ["Viral upper respiratory infection", "Seasonal influenza", "Allergic rhinitis"],
+    "recommendations": [
+        "Rest and drink plenty of fluids",
+        "Use over-the-counter medication for fever",
+        "Monitor your temperature twice a day",
+        "See a doctor if symptoms last more than a week",
+    ],
+})
+
+
+def is_starred(username: str, star_ratio: float) -> bool:
+    """Deterministic per-username star status shared with the load generator"""
+    return zlib.crc32(username.lower().encode()) % 1000 < star_ratio * 1000
+
+
+class UpstreamBehaviour:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, slow_rate=0.0, slow_ms=0.0, error_rate=0.0, seed=None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.slow_rate = slow_rate
+        self.slow = slow_ms / 1000
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    async def delay(self):
+        """Sleep for one sampled latency; True if this response should be an error"""
+        seconds = max(0.0, self.random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        if self.slow_rate and self.random.random() < self.slow_rate:
+            seconds += self.slow
+        if seconds:
+            await asyncio.sleep(seconds)
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+
+def build_app(github: UpstreamBehaviour, gemini: UpstreamBehaviour, star_ratio=0.8):
+    rate_limit = {"remaining": 1_000_000}
+
+    def github_headers():
+        rate_limit["remaining"] = max(0, rate_limit["remaining"] - 1)
+        return {
+            "X-RateLimit-Limit": "1000000",
+            "X-RateLimit-Remaining": str(rate_limit["remaining"]),
+            "X-RateLimit-Reset": str(int(time.time()) + 3600),
+        }
+
+    async def starred(request):
+        if await github.delay():
+            return JSONResponse({"message": "Server Error"}, status_code=502)
+        status = 204 if is_starred(request.path_params["username"], star_ratio) else 404
+        return Response(status_code=status, headers=github_headers())
+
+    async def user(request):
+        if await github.delay():
+            return JSONResponse({"message": "Server Error"}, status_code=502)
+        username = request.path_params["username"]
+        etag = f'"{zlib.crc32(username.encode()):08x}"'
+        headers = {**github_headers(), "ETag": etag}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse({"login": username, "type": "User"}, headers=headers)
+
+    async def stargazers(request):
+        if await github.delay():
+            return JSONResponse({"message": "Server Error"}, status_code=502)
+        return JSONResponse([], headers=github_headers())
+
+    async def generate(request):
+        if not request.path_params["method"].endswith(":generateContent"):
+            return JSONResponse({"error": {"message": "Not found"}}, status_code=404)
+        payload = json.loads(await request.body())
+        if await gemini.delay():
+            return JSONResponse({"error": {"code": 503, "message": "The model is overloaded"}}, status_code=503)
+        config = payload.get("generationConfig", {})
+        text = GEMINI_JSON if config.get("responseMimeType") == "application/json" else GEMINI_TEXT
+        prompt = payload["contents"][0]["parts"][0]["text"]
+        # Roughly four characters per token, like the real tokenizer on English text
+        usage = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4}
+        usage["totalTokenCount"] = usage["promptTokenCount"] + usage["candidatesTokenCount"]
+        return JSONResponse({
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}],
+            "usageMetadata": usage,
+        })
+
+    return Starlette(routes=[
+        Route("/github/users/{username}/starred/{owner}/{repo}", starred),
+        Route("/github/users/{username}", user),
+        Route("/github/repos/{owner}/{repo}/stargazers", stargazers),
+        Route("/gemini/v1beta/models/{method}", generate, methods=["POST"]),
+    ])
+
+
+def add_arguments(arg_parser):
+    """Fake-upstream options, shared with load_test.py"""
+    for name, latency, jitter in (("github", 40, 10), ("gemini", 800, 200)):
+        arg_parser.add_argument(f"--{name}-latency-ms", type=float, default=latency)
+        arg_parser.add_argument(f"--{name}-jitter-ms", type=float, default=jitter)
+        arg_parser.add_argument(f"--{name}-slow-rate", type=float, default=0.0, help="share of responses with extra tail latency")
+        arg_parser.add_argument(f"--{name}-slow-ms", type=float, default=0.0)
+        arg_parser.add_argument(f"--{name}-error-rate", type=float, default=0.0)
+    arg_parser.add_argument("--star-ratio", type=float, default=0.8, help="share of usernames that have starred the repo")
+    arg_parser.add_argument("--seed", type=int, default=1)
+
+
+def behaviour(args, name):
+    return UpstreamBehaviour(
+        latency_ms=getattr(args, f"{name}_latency_ms"),
+        jitter_ms=getattr(args, f"{name}_jitter_ms"),
+        slow_rate=getattr(args, f"{name}_slow_rate"),
+        slow_ms=getattr(args, f"{name}_slow_ms"),
+        error_rate=getattr(args, f"{name}_error_rate"),
+        seed=args.seed,
+    )
+
+
+def main():
+    import uvicorn
+
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=9100)
+    add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    app = build_app(behaviour(args, "github"), behaviour(args, "gemini"), args.star_ratio)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Load-test harness for the API against local fake GitHub and Gemini servers
+
+Usage (from backend/):
+    python benchmarks/load_test.py [--duration 20] [--concurrency 32 | --rate 200]
+                                   [--mix /=1,/verify-star=2,/check-symptoms=4]
+                                   [--output run.json] [--baseline base.json --tolerance 0.15]
+
+Starts benchmarks/fake_upstreams.py and the app (uvicorn main:app) as
+subprocesses, with the app's GITHUB_API_URL and GEMINI_API_URL pointed at
+the fakes, then drives the endpoints either closed-loop (--concurrency
+workers back to back) or open-loop (--rate requests per second; latency
+counts from the scheduled start, so queueing delay is not hidden).
+
+Prints one JSON document with throughput, p50/p95/p99 latency and the
+error rate per endpoint and overall. Errors are transport failures and 5xx
+responses; every status code is counted. With --baseline, the run is
+compared to an earlier report and the exit status is 1 if p95 latency or
+(between closed-loop runs) throughput regressed by more than --tolerance,
+or the error rate rose by more than one percentage point.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import fake_upstreams  # noqa: E402
+
+SYMPTOMS = [
+    "fever", "cough", "headache", "sore throat", "runny nose", "fatigue", "nausea", "vomiting",
+    "diarrhea", "chest pain", "shortness of breath", "dizziness", "rash", "joint pain", "back pain",
+    "abdominal pain", "chills", "muscle aches", "loss of smell", "sneezing",
+]
+AGE_GROUPS = ["Child", "Teen", "Adult", "Senior"]
+GENDERS = ["Male", "Female", "Other"]
+
+# Absolute error-rate increase tolerated by --baseline comparisons
+ERROR_RATE_SLACK = 0.01
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        path, _, weight = part.partition("=")
+        mix[path.strip()] = float(weight or 1)
+    unknown = set(mix) - {"/", "/verify-star", "/check-symptoms"}
+    if unknown:
+        raise SystemExit(f"unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Workload:
+    """Deterministic request generator over pools of usernames and symptom sets"""
+
+    def __init__(self, mix, users, symptom_sets, star_ratio, seed):
+        self.random = random.Random(seed)
+        self.paths = list(mix)
+        self.weights = [mix[path] for path in self.paths]
+        self.users = [f"bench-user-{n}" for n in range(users)]
+        self.starred = [user for user in self.users if fake_upstreams.is_starred(user, star_ratio)] or ["test"]
+        self.symptom_sets = [
+            {
+                "symptoms": ", ".join(self.random.sample(SYMPTOMS, self.random.randint(1, 4))),
+                "age_group": self.random.choice(AGE_GROUPS),
+                "gender": self.random.choice(GENDERS),
+            }
+            for _ in range(symptom_sets)
+        ]
+
+    def next(self):
+        """(endpoint, method, url, kwargs) for the next request"""
+        path = self.random.choices(self.paths, self.weights)[0]
+        if path == "/":
+            return path, "GET", "/", {"headers": {"Accept-Encoding": "gzip, br"}}
+        if path == "/verify-star":
+            return path, "POST", "/verify-star", {"json": {"github_username": self.random.choice(self.users)}}
+        username = self.random.choice(self.starred)
+        return path, "POST", f"/check-symptoms?github_username={username}", {"json": self.random.choice(self.symptom_sets)}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def add(self, endpoint, seconds, status):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        statuses = self.statuses.setdefault(endpoint, {})
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == "error" or status >= 500:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed):
+        def describe(latencies, errors, statuses):
+            ordered = sorted(latencies)
+            return {
+                "requests": len(ordered),
+                "throughput_rps": round(len(ordered) / elapsed, 2),
+                "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 2) if ordered else None,
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 2) if ordered else None,
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 2) if ordered else None,
+                "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+            }
+
+        endpoints = {
+            endpoint: describe(self.latencies[endpoint], self.errors.get(endpoint, 0), self.statuses[endpoint])
+            for endpoint in sorted(self.latencies)
+        }
+        combined = {}
+        for statuses in self.statuses.values():
+            for status, count in statuses.items():
+                combined[status] = combined.get(status, 0) + count
+        overall = describe([s for values in self.latencies.values() for s in values], sum(self.errors.values()), combined)
+        return endpoints, overall
+
+
+async def send(client, recorder, request, started):
+    endpoint, method, url, kwargs = request
+    try:
+        response = await client.request(method, url, **kwargs)
+        status = response.status_code
+    except httpx.HTTPError:
+        status = "error"
+    recorder.add(endpoint, time.perf_counter() - started, status)
+
+
+async def closed_loop(client, workload, recorder, concurrency, deadline):
+    async def worker():
+        while time.perf_counter() < deadline:
+            await send(client, recorder, workload.next(), time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client, workload, recorder, rate, deadline, max_outstanding):
+    interval = 1.0 / rate
+    outstanding = set()
+    scheduled = time.perf_counter()
+    while scheduled < deadline:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(outstanding) >= max_outstanding:
+            # Client saturated: count the slot as a failed request rather than silently skipping it
+            recorder.add(workload.next()[0], time.perf_counter() - scheduled, "error")
+        else:
+            task = asyncio.ensure_future(send(client, recorder, workload.next(), scheduled))
+            outstanding.add(task)
+            task.add_done_callback(outstanding.discard)
+        scheduled += interval
+    if outstanding:
+        await asyncio.gather(*outstanding)
+
+
+async def drive(args, base_url):
+    workload = Workload(parse_mix(args.mix), args.users, args.symptom_sets, args.star_ratio, args.seed)
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_outstanding))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        if args.warmup:
+            await closed_loop(client, workload, Recorder(), args.concurrency, time.perf_counter() + args.warmup)
+        recorder = Recorder()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        if args.rate:
+            await open_loop(client, workload, recorder, args.rate, deadline, args.max_outstanding)
+        else:
+            await closed_loop(client, workload, recorder, args.concurrency, deadline)
+        return recorder.summary(time.perf_counter() - started)
+
+
+def wait_ready(url, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"process exited early with status {process.returncode}: {' '.join(process.args)}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise SystemExit(f"timed out waiting for {url}")
+
+
+def start_processes(args):
+    """Start the fakes and the app; returns (app base URL, processes)"""
+    processes = []
+    fake_port = free_port()
+    fake_command = [sys.executable, os.path.join(BENCHMARKS_DIR, "fake_upstreams.py"), "--port", str(fake_port)]
+    for key, value in vars(args).items():
+        if key.startswith(("github_", "gemini_")) or key in ("star_ratio", "seed"):
+            fake_command += [f"--{key.replace('_', '-')}", str(value)]
+    processes.append(subprocess.Popen(fake_command, cwd=BACKEND_DIR))
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    wait_ready(f"{fake_url}/github/users/ready", processes[-1])
+
+    env = dict(os.environ)
+    env.update(GITHUB_API_URL=f"{fake_url}/github", GEMINI_API_URL=f"{fake_url}/gemini")
+    # Fresh, self-contained app state unless the caller overrides it; all load comes
+    # from one IP, so per-client rate limits are off by default
+    for key, value in (("GEMINI_API_KEY", "bench-key"), ("GITHUB_TOKEN", "bench-token"), ("ANALYSIS_CACHE_PATH", ""),
+                       ("STAR_CACHE_PATH", ""), ("HISTORY_PATH", ""), ("STARGAZER_SYNC_ENABLED", "false"),
+                       ("LOG_LEVEL", "WARNING"), ("RATE_LIMIT_IP_RATE", "0"), ("RATE_LIMIT_USERNAME_RATE", "0")):
+        env.setdefault(key, value)
+    app_port = free_port()
+    app_command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+                   "--log-level", "warning", "--no-access-log"]
+    processes.append(subprocess.Popen(app_command, cwd=BACKEND_DIR, env=env))
+    app_url = f"http://127.0.0.1:{app_port}"
+    wait_ready(f"{app_url}/api", processes[-1])
+    return app_url, processes
+
+
+def compare(report, baseline, tolerance):
+    """Regressions of this report against a baseline report, per endpoint and overall"""
+    regressions = []
+    # Open-loop throughput is set by --rate, so it only means something between closed-loop runs
+    closed_loop_runs = report["config"]["mode"] == "closed" and baseline.get("config", {}).get("mode") == "closed"
+    current = {**report["endpoints"], "overall": report["overall"]}
+    previous = {**baseline.get("endpoints", {}), "overall": baseline.get("overall", {})}
+    for endpoint, stats in current.items():
+        before = previous.get(endpoint)
+        if not before or not before.get("requests"):
+            continue
+        checks = (
+            ("p95_ms", stats["p95_ms"], before["p95_ms"], lambda new, old: new > old * (1 + tolerance)),
+            ("throughput_rps", stats["throughput_rps"], before["throughput_rps"], lambda new, old: new < old * (1 - tolerance)),
+            ("error_rate", stats["error_rate"], before["error_rate"], lambda new, old: new > old + ERROR_RATE_SLACK),
+        )
+        for metric, new, old, regressed in checks:
+            if metric == "throughput_rps" and not closed_loop_runs:
+                continue
+            if new is not None and old is not None and regressed(new, old):
+                regressions.append({"endpoint": endpoint, "metric": metric, "baseline": old, "current": new})
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--duration", type=float, default=20.0, help="seconds of measured load")
+    arg_parser.add_argument("--warmup", type=float, default=2.0, help="seconds of unmeasured load first")
+    arg_parser.add_argument("--concurrency", type=int, default=32, help="closed-loop workers")
+    arg_parser.add_argument("--rate", type=float, default=0.0, help="open-loop requests per second (overrides --concurrency)")
+    arg_parser.add_argument("--max-outstanding", type=int, default=1000, help="open-loop cap on requests in flight")
+    arg_parser.add_argument("--timeout", type=float, default=60.0)
+    arg_parser.add_argument("--mix", default="/=1,/verify-star=2,/check-symptoms=4", help="endpoint=weight list")
+    arg_parser.add_argument("--users", type=int, default=2000, help="distinct GitHub usernames")
+    arg_parser.add_argument("--symptom-sets", type=int, default=200, help="distinct symptom inputs")
+    arg_parser.add_argument("--app-url", help="drive an already running app instead of starting one (and the fakes)")
+    arg_parser.add_argument("--output", help="also write the report to this file")
+    arg_parser.add_argument("--baseline", help="earlier report to compare against")
+    arg_parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    fake_upstreams.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    processes = []
+    try:
+        if args.app_url:
+            app_url = args.app_url
+        else:
+            app_url, processes = start_processes(args)
+        endpoints, overall = asyncio.run(drive(args, app_url))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    report = {
+        "config": {
+            "mode": "open" if args.rate else "closed",
+            "rate": args.rate or None,
+            "concurrency": None if args.rate else args.concurrency,
+            "duration": args.duration,
+            "mix": parse_mix(args.mix),
+            "users": args.users,
+            "symptom_sets": args.symptom_sets,
+            "upstreams": {key: value for key, value in vars(args).items() if key.startswith(("github_", "gemini_"))},
+        },
+        "endpoints": endpoints,
+        "overall": overall,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Micro-benchmark and correctness check for the Gemini response parser
+
+Usage (from backend/):
+    python benchmarks/parser_bench.py [--repeat N] [--check] [--max-ratio R]
+
+Prints one JSON document with per-parser accuracy over parser_corpus.json
+and the mean parse time per response. The legacy chained-replace parser is
+kept here as the baseline. --check exits non-zero if the current parser
+misses any corpus expectation or takes more than --max-ratio times the
+legacy parser's time per response; the ratio is measured in the same run,
+so the gate holds on any machine.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_parser import MAX_DIAGNOSES, MAX_RECOMMENDATIONS, parse_analysis  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parser_corpus.json")
+
+
+def legacy_parse_analysis(ai_response):
+    """The original check_symptoms parser, kept verbatim as the baseline"""
+    diagnoses = []
+    recommendations = []
+    current_section = None
+    for line in ai_response.split('\n'):
+        line = line.strip().replace('-', '').replace('*', '').replace('•', '').replace('1.', '').replace('2.', '').replace('3.', '').replace('4.', '')
+        if any(word in line.lower() for word in ['diagnos', 'possible', 'condition']):
+            current_section = 'diagnoses'
+        elif any(word in line.lower() for word in ['recommend', 'advice', 'suggest', 'step']):
+            current_section = 'recommendations'
+        elif line and len(line) > 15:
+            if current_section == 'diagnoses':
+                diagnoses.append(line)
+            elif current_section == 'recommendations':
+                recommendations.append(line)
+            elif any(word in line.lower() for word in ['consult', 'see', 'visit', 'call', 'seek', 'rest', 'monitor']):
+                recommendations.append(line)
+            else:
+                diagnoses.append(line)
+    return {"diagnoses": diagnoses[:MAX_DIAGNOSES], "recommendations": recommendations[:MAX_RECOMMENDATIONS]}
+
+
+def score(parse, corpus):
+    """Fraction of expected items reproduced exactly, plus the names of imperfect cases"""
+    expected_total = 0
+    matched = 0
+    failures = []
+    for case in corpus:
+        result = parse(case["text"])
+        case_ok = True
+        for section, limit in (("diagnoses", MAX_DIAGNOSES), ("recommendations", MAX_RECOMMENDATIONS)):
+            expected = case["expected"][section][:limit]
+            got = result[section]
+            expected_total += len(expected)
+            matched += sum(1 for want, have in zip(expected, got) if want == have)
+            case_ok = case_ok and got == expected
+        if not case_ok:
+            failures.append(case["name"])
+    return matched / expected_total if expected_total else 1.0, failures
+
+
+def mean_parse_time(parse, corpus, repeat):
+    texts = [case["text"] for case in corpus]
+    seconds = timeit.timeit(lambda: [parse(text) for text in texts], number=repeat)
+    return seconds / (repeat * len(texts))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=2000)
+    arg_parser.add_argument("--check", action="store_true",
+                            help="fail if the current parser misses any case or is over --max-ratio")
+    arg_parser.add_argument("--max-ratio", type=float, default=1.5,
+                            help="highest allowed current/legacy parse time under --check (default: 1.5)")
+    args = arg_parser.parse_args()
+
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    report = {"cases": len(corpus), "repeat": args.repeat, "max_ratio": args.max_ratio, "parsers": {}}
+    for name, parse in (("current", parse_analysis), ("legacy", legacy_parse_analysis)):
+        accuracy, failures = score(parse, corpus)
+        report["parsers"][name] = {
+            "accuracy": round(accuracy, 4),
+            "failures": failures,
+            "mean_us_per_response": round(mean_parse_time(parse, corpus, args.repeat) * 1e6, 2),
+        }
+    current, legacy = report["parsers"]["current"], report["parsers"]["legacy"]
+    report["time_ratio"] = round(current["mean_us_per_response"] / legacy["mean_us_per_response"], 3)
+    print(json.dumps(report, indent=2))
+
+    if args.check and (current["failures"] or report["time_ratio"] > args.max_ratio):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            # Expired entries stay until evicted so get_stale can still serve them
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_stale(self, key, default=None):
+        """Return the value even if it has expired, for use when the origin is unavailable"""
+        entry = self._data.get(key)
+        return default if entry is None else entry[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def ttl_left(self, key):
+        """Seconds until the entry expires (negative once expired), or None if absent"""
+        entry = self._data.get(key)
+        return None if entry is None else entry[0] - time.monotonic()
+
+    def invalidate(self, key):
+        """Drop a single entry; returns True if it was present"""
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        self._data.clear()
+
+    # Awaitable forms, so callers handed a SharedTTLCache (whose shared tier is SQLite) can keep the
+    # event loop free with the same code; here nothing blocks
+    async def aget(self, key, default=None):
+        return self.get(key, default)
+
+    async def aget_stale(self, key, default=None):
+        return self.get_stale(key, default)
+
+    async def aset(self, key, value, ttl=None):
+        self.set(key, value, ttl=ttl)
+
+    async def ainvalidate(self, key):
+        return self.invalidate(key)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
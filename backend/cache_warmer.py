@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import secrets
+import threading
+import time
+
+from pydantic import ValidationError
+
+from analysis_cache import analysis_key
+from schemas import SymptomRequest
+from shared_cache import connect
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+
+def load_seeds(path):
+    """Analysis args for each record in a JSON array of {symptoms, age_group, gender} objects
+
+    Records are validated like API input; invalid ones are logged and
+    skipped, and inputs that share a cache key are kept once.
+    """
+    with open(path, encoding="utf-8") as f:
+        records = json.load(f)
+    seeds, seen = [], set()
+    for index, record in enumerate(records):
+        try:
+            args = SymptomRequest.parse_obj(record).analysis_args()
+        except ValidationError as e:
+            log.warning("warm_seed_invalid", index=index, error=str(e))
+            continue
+        key = analysis_key(*args)
+        if key not in seen:
+            seen.add(key)
+            seeds.append(args)
+    return seeds
+
+
+class WarmerLease:
+    """Which worker process may run the cache warmer, and the hourly budget it spends, in one SQLite row
+
+    Every worker starts a warmer; each run first tries to acquire() the
+    lease, which succeeds for its holder or once the holder has not renewed
+    it for `ttl` seconds (say because that worker died). take() spends one
+    call from a token bucket kept in the same row and renews the lease, so
+    the budget is shared across workers and survives a change of holder.
+    With no path the row lives in memory and only this process uses it.
+    """
+
+    def __init__(self, path, rate, burst, ttl, name="cache_warmer"):
+        self.rate = rate
+        self.burst = burst
+        self.ttl = ttl
+        self.name = name
+        self.owner = f"{os.getpid()}-{secrets.token_hex(4)}"
+        self._lock = threading.Lock()
+        self._db = connect(path or ":memory:")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS warmer_lease (name TEXT PRIMARY KEY, owner TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _execute(self, sql, params):
+        with self._lock:
+            if self._db is None:
+                return 0
+            return self._db.execute(sql, params).rowcount
+
+    def acquire(self):
+        """Take or renew the lease; True if this process holds it. Blocking"""
+        now = time.time()
+        return self._execute(
+            "INSERT INTO warmer_lease (name, owner, expires_at, tokens, updated) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE warmer_lease.owner = excluded.owner OR warmer_lease.expires_at <= ?",
+            (self.name, self.owner, now + self.ttl, self.burst, now, now),
+        ) == 1
+
+    def take(self):
+        """Spend one call from the shared budget; False if it is spent or the lease was lost. Blocking"""
+        now = time.time()
+        return self._execute(
+            "UPDATE warmer_lease SET tokens = min(?1, tokens + (?2 - updated) * ?3) - 1, updated = ?2, "
+            "expires_at = ?2 + ?4 WHERE name = ?5 AND owner = ?6 AND min(?1, tokens + (?2 - updated) * ?3) >= 1",
+            (self.burst, now, self.rate, self.ttl, self.name, self.owner),
+        ) == 1
+
+    def release(self):
+        """Let another worker take over straight away. Blocking"""
+        self._execute("UPDATE warmer_lease SET expires_at = 0 WHERE name = ? AND owner = ?", (self.name, self.owner))
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class CacheWarmer:
+    """Keeps analyses of a seed list of common inputs cached, recomputing them before they expire
+
+    Every `interval` seconds, seeds missing from the cache or expiring within
+    `refresh_before` are recomputed by `refresh(*args)`, soonest expiry first,
+    at most `rate` per second and `budget` per hour. A run ends when the
+    budget is spent or at the first failure, so an unhealthy upstream is
+    not spent on. With refresh_before longer than interval, entries are
+    renewed before anyone sees them expire.
+
+    Only the worker holding the WarmerLease in `lease_path` runs; the others
+    check back each interval in case it has gone.
+    """
+
+    def __init__(self, seeds, refresh, ttl_left, interval=900, refresh_before=3600, rate=0.5, budget=200,
+                 lease_path=None):
+        self.seeds = seeds
+        self.refresh = refresh
+        self.ttl_left = ttl_left
+        self.interval = interval
+        self.refresh_before = refresh_before
+        self.rate = rate
+        # A lease outlives a missed run, so a slow run does not hand over to another worker
+        self.lease = WarmerLease(lease_path, budget / 3600, budget, ttl=2 * interval)
+        self.leader = False
+        self.runs = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.last_run = None
+        self._task = None
+
+    async def run_once(self):
+        """One warm-up pass; returns how many seeds were recomputed (0 if another worker holds the lease)"""
+        self.leader = await asyncio.to_thread(self.lease.acquire)
+        if not self.leader:
+            return 0
+        left = await asyncio.to_thread(lambda: [self.ttl_left(args) for args in self.seeds])
+        due = sorted(
+            ((remaining or 0, args) for remaining, args in zip(left, self.seeds)
+             if remaining is None or remaining < self.refresh_before),
+            key=lambda item: item[0],
+        )
+        refreshed = 0
+        for _, args in due:
+            if not await asyncio.to_thread(self.lease.take):
+                log.info("cache_warm_budget_spent", due=len(due), refreshed=refreshed)
+                break
+            try:
+                await self.refresh(*args)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                log.warning("cache_warm_failed", error=str(e), refreshed=refreshed)
+                break
+            refreshed += 1
+            self.refreshed += 1
+            await asyncio.sleep(1 / self.rate)
+        self.runs += 1
+        self.last_run = time.time()
+        log.info("cache_warm", seeds=len(self.seeds), due=len(due), refreshed=refreshed)
+        return refreshed
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("cache_warm_failed", error=str(e))
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.lease.release)
+        self.lease.close()
+
+    def stats(self):
+        return {
+            "seeds": len(self.seeds),
+            "leader": self.leader,
+            "runs": self.runs,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "last_run": self.last_run,
+        }
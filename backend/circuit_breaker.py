@@ -0,0 +1,192 @@
+import asyncio
+import time
+from collections import deque
+
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while the breaker is open"""
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies"""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, fraction):
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Count-based circuit breaker with adaptive timeouts and optional hedging
+
+    The last `window` outcomes are kept; once at least `min_calls` are known
+    and the share of failures (errors, timeouts, or calls slower than
+    `slow_call_seconds`) reaches `failure_rate`, the breaker opens and
+    rejects calls for `open_seconds`. It then lets `half_open_calls` probes
+    through; one success closes it, one failure re-opens it.
+
+    The per-call timeout follows observed latency: `timeout_factor` x p99,
+    clamped to [min_timeout, max_timeout]. With hedging on, a second attempt
+    starts once the first has run past the `hedge_percentile` latency and
+    whichever finishes successfully first wins.
+    """
+
+    def __init__(self, name, failure_rate=0.5, min_calls=20, window=50, slow_call_seconds=10.0,
+                 open_seconds=30.0, half_open_calls=1, min_timeout=2.0, max_timeout=30.0,
+                 timeout_factor=1.5, hedge=False, hedge_percentile=0.95, min_samples=20, exclude=()):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.exclude = tuple(exclude)
+        self.state = CLOSED
+        self.latency = LatencyTracker()
+        self.counters = {state: {"calls": 0, "successes": 0, "failures": 0, "rejected": 0}
+                         for state in (CLOSED, OPEN, HALF_OPEN)}
+        self.transitions = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+
+    def _transition(self, state):
+        if state != self.state:
+            log.warning("circuit_transition", circuit=self.name, previous=self.state, state=state)
+            self.state = state
+            self.transitions += 1
+            self._probes = 0
+            if state == OPEN:
+                self._opened_at = time.monotonic()
+            elif state == CLOSED:
+                self._outcomes.clear()
+
+    def timeout(self):
+        """Current per-call timeout derived from observed p99 latency"""
+        if len(self.latency) < self.min_samples:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, self.latency.percentile(0.99) * self.timeout_factor))
+
+    def acquire(self):
+        """Admit one call or raise CircuitOpenError; pair every admission with record()"""
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        if self.state == OPEN or (self.state == HALF_OPEN and self._probes >= self.half_open_calls):
+            self.counters[self.state]["rejected"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        if self.state == HALF_OPEN:
+            self._probes += 1
+        self.counters[self.state]["calls"] += 1
+
+    def release(self):
+        """Give back an admission whose outcome says nothing about upstream health"""
+        if self.state == HALF_OPEN and self._probes:
+            self._probes -= 1
+
+    def record(self, success, seconds=None):
+        """Report the outcome of an admitted call
+
+        Leave seconds out for calls whose duration is not comparable to a
+        single request, such as a streamed reply: the outcome still counts,
+        but the call neither feeds the latency tracker nor is judged slow.
+        """
+        if success and seconds is not None and seconds > self.slow_call_seconds:
+            success = False
+        self.counters[self.state]["successes" if success else "failures"] += 1
+        if success and seconds is not None:
+            self.latency.add(seconds)
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED if success else OPEN)
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+            self._transition(OPEN)
+
+    async def call(self, fn, *args, hedge=None, timeout=None):
+        """Run fn(*args) through the breaker with the adaptive (or the given) timeout"""
+        self.acquire()
+        started = time.monotonic()
+        try:
+            result = await self._run(fn, args, self.hedge if hedge is None else hedge, timeout or self.timeout())
+        except self.exclude:
+            # The upstream answered; the failure is ours (e.g. unparseable output)
+            self.record(True, time.monotonic() - started)
+            raise
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+            self.record(False, time.monotonic() - started)
+            raise
+        self.record(True, time.monotonic() - started)
+        return result
+
+    async def _run(self, fn, args, hedge, timeout):
+        hedge_after = self.latency.percentile(self.hedge_percentile) if hedge and len(self.latency) >= self.min_samples else None
+        if hedge_after is None or hedge_after >= timeout:
+            return await asyncio.wait_for(fn(*args), timeout)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        pending = {asyncio.ensure_future(fn(*args))}
+        error = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if not done:
+                self.hedges += 1
+                pending.add(asyncio.ensure_future(fn(*args)))
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "timeout": round(self.timeout(), 3),
+            "p99": self.latency.percentile(0.99),
+            "transitions": self.transitions,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "counters": self.counters,
+        }
@@ -0,0 +1,67 @@
+import os
+import time
+
+
+def process_age():
+    """Seconds since this process was started, or None where /proc is unavailable
+
+    Includes interpreter start-up and every import before the caller's,
+    which a timer started inside the app cannot see.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22, counted after the parenthesised command name, which may contain spaces
+            started_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - started_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class ColdStartTimer:
+    """Marks for the phases of a cold start, in seconds since the process started
+
+    `origin` is a perf_counter() reading taken as early as possible in the
+    app module; when the process start time is known the marks are shifted
+    to count from it instead.
+    """
+
+    def __init__(self, origin):
+        age = process_age()
+        self.origin = origin if age is None else time.perf_counter() - age
+        self.marks = {}
+
+    def mark(self, phase):
+        """Record the first time `phase` is reached; later calls keep the first value"""
+        if phase not in self.marks:
+            self.marks[phase] = time.perf_counter() - self.origin
+        return self.marks[phase]
+
+    def stats(self):
+        return {phase: round(seconds, 4) for phase, seconds in self.marks.items()}
+
+
+class FirstRequestMiddleware:
+    """Pure ASGI middleware calling `on_first(timer)` once the first HTTP response has been sent"""
+
+    def __init__(self, app, timer, phase="first_request", on_first=None):
+        self.app = app
+        self.timer = timer
+        self.phase = phase
+        self.on_first = on_first
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.phase in self.timer.marks:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                if self.phase not in self.timer.marks:
+                    self.timer.mark(self.phase)
+                    if self.on_first is not None:
+                        self.on_first(self.timer)
+
+        await self.app(scope, receive, send_wrapper)
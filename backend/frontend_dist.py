@@ -0,0 +1,87 @@
+import mimetypes
+import os
+
+from starlette.responses import FileResponse
+
+from precompressed import PrecompressedAsset, accepted_encodings
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+DEFAULT_CACHE = "public, max-age=3600"
+
+# Precompressed siblings written next to each file by precompress.py, in preference order
+SIBLINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class SendfileResponse(FileResponse):
+    """FileResponse that hands the file to the server for zero-copy sending when it can
+
+    Servers advertising the ASGI `http.response.pathsend` or
+    `http.response.zerocopysend` extension send the body with sendfile(2);
+    elsewhere it falls back to streaming in 64 KiB chunks.
+    """
+
+    chunk_size = 64 * 1024
+
+    async def __call__(self, scope, receive, send):
+        extensions = scope.get("extensions") or {}
+        zero_copy = "http.response.pathsend" in extensions or "http.response.zerocopysend" in extensions
+        if not zero_copy or self.send_header_only:
+            await super().__call__(scope, receive, send)
+            return
+
+        if self.stat_result is None:
+            self.set_stat_headers(os.stat(self.path))
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": os.fspath(self.path)})
+        else:
+            with open(self.path, "rb") as file:
+                await send({"type": "http.response.zerocopysend", "file": file})
+        if self.background is not None:
+            await self.background()
+
+
+class FrontendDist:
+    """Serves a Vite build directory: hashed assets as immutable, everything else via the SPA index"""
+
+    def __init__(self, root, immutable_prefix="assets/"):
+        self.root = os.path.realpath(root)
+        self.immutable_prefix = immutable_prefix
+        self.index = PrecompressedAsset.from_file(os.path.join(self.root, "index.html"), "text/html")
+
+    def resolve(self, url_path: str):
+        """Absolute path of a regular file inside the build directory, or None"""
+        relative = url_path.lstrip("/")
+        if not relative:
+            return None
+        full = os.path.realpath(os.path.join(self.root, relative))
+        # Reject traversal outside the build directory
+        if not full.startswith(self.root + os.sep) or not os.path.isfile(full):
+            return None
+        return full
+
+    def file_response(self, request, full):
+        relative = os.path.relpath(full, self.root).replace(os.sep, "/")
+        if relative == "index.html":
+            return self.index.response(request)
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE if relative.startswith(self.immutable_prefix) else DEFAULT_CACHE,
+            "Vary": "Accept-Encoding",
+        }
+        media_type = mimetypes.guess_type(full)[0] or "application/octet-stream"
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        for encoding, suffix in SIBLINGS:
+            if encoding in accepted and os.path.isfile(full + suffix):
+                headers["Content-Encoding"] = encoding
+                full += suffix
+                break
+        return SendfileResponse(full, media_type=media_type, headers=headers, method=request.method)
+
+    def response(self, request):
+        """File for the request path, the SPA index for page navigations, else None"""
+        full = self.resolve(request.url.path)
+        if full is not None:
+            return self.file_response(request, full)
+        if request.method in ("GET", "HEAD") and "text/html" in request.headers.get("accept", ""):
+            return self.index.response(request)
+        return None
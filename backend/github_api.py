@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+import httpx
+
+from cache import TTLCache
+from http_client import UNOBSERVED
+
+
+class RateLimitExhausted(Exception):
+    """Raised instead of calling GitHub when the remaining quota cannot cover the request"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"GitHub rate limit exhausted, retry in {retry_after:.0f}s")
+        self.retry_after = max(0.0, retry_after)
+
+
+class GitHubAPI:
+    """Rate-limit-aware GitHub GET scheduler with ETag revalidation
+
+    Quota and reset time are read from every response. Once the remaining
+    budget drops below slowdown_fraction of the limit, calls are queued and
+    spaced out so the rest of the budget lasts until the reset; when it is
+    gone (or the wait would exceed max_wait) RateLimitExhausted is raised so
+    callers can answer from cache. Responses carrying an ETag are kept and
+    revalidated with If-None-Match; a 304 does not count against the quota.
+    """
+
+    def __init__(self, clients, token=None, reserve=0, slowdown_fraction=0.1, max_wait=5.0, etag_cache_size=5000):
+        self.clients = clients
+        self.token = token
+        self.reserve = reserve
+        self.slowdown_fraction = slowdown_fraction
+        self.max_wait = max_wait
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.not_modified = 0
+        self._blocked_until = 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+        self._etags = TTLCache(maxsize=etag_cache_size, ttl=24 * 3600)
+
+    def _headers(self, extra=None):
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.token:
+            headers["Authorization"] = f"token {self.token}"
+        if extra:
+            headers.update(extra)
+        return headers
+
+    def _throttled(self):
+        return (
+            self.remaining is not None and self.limit is not None and self.reset_at is not None
+            and self.remaining <= self.limit * self.slowdown_fraction
+        )
+
+    async def _acquire(self):
+        """Reserve a send slot, waiting for it when the budget is running low"""
+        async with self._lock:
+            now = time.time()
+            if self.reset_at is not None and now >= self.reset_at:
+                # Window rolled over; trust the next response's headers
+                self.remaining = None
+                self.reset_at = None
+            if now < self._blocked_until:
+                raise RateLimitExhausted(self._blocked_until - now)
+            if self.remaining is not None and self.remaining <= self.reserve:
+                raise RateLimitExhausted((self.reset_at or now) - now)
+
+            delay = 0.0
+            if self._throttled():
+                # Spread what is left evenly over the time until the reset
+                spacing = (self.reset_at - now) / max(1, self.remaining - self.reserve)
+                slot = max(now, self._next_slot)
+                delay = slot - now
+                if delay > self.max_wait:
+                    raise RateLimitExhausted(delay)
+                self._next_slot = slot + spacing
+            else:
+                self._next_slot = 0.0
+            if self.remaining is not None:
+                self.remaining -= 1
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _record(self, response):
+        headers = response.headers
+        if "X-RateLimit-Remaining" in headers:
+            self.remaining = int(headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Limit" in headers:
+            self.limit = int(headers["X-RateLimit-Limit"])
+        if "X-RateLimit-Reset" in headers:
+            self.reset_at = float(headers["X-RateLimit-Reset"])
+        if response.status_code in (403, 429):
+            if "Retry-After" in headers:
+                self._blocked_until = time.time() + float(headers["Retry-After"])
+            elif self.remaining == 0 and self.reset_at is not None:
+                self._blocked_until = self.reset_at
+
+    async def check_rate_limit(self, timeout):
+        """GET /rate_limit, which GitHub does not count against the quota, and record the quota it reports"""
+        response = await self.clients.github.get(
+            "/rate_limit", headers=self._headers(), timeout=timeout, extensions=UNOBSERVED
+        )
+        self._record(response)
+        return response
+
+    async def get(self, url, params=None, headers=None):
+        """GET url through the scheduler, transparently revalidating cached bodies"""
+        key = str(httpx.URL(url, params=params))
+        cached = self._etags.get(key)
+        extra = dict(headers or {})
+        if cached is not None:
+            extra["If-None-Match"] = cached[0]
+
+        await self._acquire()
+        response = await self.clients.github.get(url, params=params, headers=self._headers(extra))
+        self._record(response)
+
+        if response.status_code == 304 and cached is not None:
+            self.not_modified += 1
+            etag, status_code, cached_headers, content = cached
+            return httpx.Response(status_code, headers=cached_headers, content=content, request=response.request)
+        if "ETag" in response.headers and response.status_code < 300:
+            # Body is stored decoded, so drop the headers describing the wire encoding
+            cached_headers = [
+                (name, value) for name, value in response.headers.items()
+                if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+            ]
+            self._etags.set(key, (response.headers["ETag"], response.status_code, cached_headers, response.content))
+        return response
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_at": self.reset_at,
+            "not_modified": self.not_modified,
+            "etags": len(self._etags),
+        }
@@ -0,0 +1,56 @@
+"""Gunicorn settings for the multi-worker production mode (python run.py --production)
+
+Each worker is a uvicorn event loop running main:app. The app is imported
+per worker rather than preloaded, so `kill -HUP <master pid>` gracefully
+reloads code: new workers start, old ones finish in-flight requests within
+graceful_timeout and exit.
+"""
+import math
+import os
+
+
+def cgroup_cpu_limit():
+    """CPUs allowed by a cgroup quota (v2 cpu.max or v1 cfs quota), or None if unlimited or unknown"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = f.read().strip()
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    if quota in ("max", "-1"):
+        return None
+    try:
+        return max(1, math.ceil(int(quota) / int(period)))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def default_workers():
+    """One worker per CPU this process may use: its affinity mask, capped by any container CPU quota
+
+    Affinity alone reports every host CPU in a quota-limited container.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    return min(cpus, limit) if limit else cpus
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY") or default_workers())
+worker_class = "uvicorn.workers.UvicornWorker"
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.environ.get("WORKER_TIMEOUT", 60))
+keepalive = int(os.environ.get("KEEPALIVE", 5))
+# Recycle workers after this many requests (0 = never), jittered so they do not restart together
+max_requests = int(os.environ.get("MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+pidfile = os.environ.get("GUNICORN_PIDFILE") or None
+accesslog = None
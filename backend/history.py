@@ -0,0 +1,176 @@
+import hashlib
+import hmac
+import queue
+import secrets
+import threading
+import time
+
+from shared_cache import connect
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+COLUMNS = ("id", "ts", "user_hash", "endpoint", "source", "tier", "cache_hit", "latency_ms")
+
+
+def hash_username(username, key):
+    """Stable pseudonym for a GitHub username: HMAC-SHA256 keyed with a secret
+
+    Usernames are public, so an unkeyed hash would let anyone hash a list of
+    them to find who is who; there is deliberately no keyless variant.
+    """
+    if not username:
+        return None
+    return hmac.new(key.encode("utf-8"), username.lower().encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def encode_cursor(row):
+    return f"{row['ts']!r}:{row['id']}"
+
+
+def decode_cursor(cursor):
+    """(ts, id) from a cursor returned by query(); raises ValueError if malformed"""
+    ts, _, row_id = cursor.partition(":")
+    return float(ts), int(row_id)
+
+
+class HistoryStore:
+    """Append-only record of analyses served, in a SQLite table in WAL mode
+
+    record() only enqueues: one writer thread inserts rows in batches of up
+    to `batch_size`, flushing at least every `flush_interval` seconds, so a
+    request never waits on disk. When `queue_size` rows are already waiting
+    new ones are dropped and counted. Reads page newest first with a
+    (ts, id) keyset cursor over the ts and (user_hash, ts) indexes, so a page
+    costs the same however deep it is.
+
+    Usernames are stored as hash_username(name, hash_key). Without a
+    hash_key a random one is generated on first use and kept in the
+    database, so every worker and restart hashes alike while the key never
+    leaves the file.
+    """
+
+    def __init__(self, path, hash_key=None, batch_size=500, flush_interval=1.0, queue_size=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._db = connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_history ("
+            "id INTEGER PRIMARY KEY, ts REAL NOT NULL, user_hash TEXT, endpoint TEXT NOT NULL, "
+            "source TEXT NOT NULL, tier TEXT NOT NULL, cache_hit INTEGER NOT NULL, latency_ms REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS analysis_history_ts ON analysis_history (ts)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS analysis_history_user ON analysis_history (user_hash, ts)")
+        self.hash_key = hash_key or self._stored_hash_key()
+
+    def _stored_hash_key(self):
+        self._db.execute("CREATE TABLE IF NOT EXISTS history_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # INSERT OR IGNORE: when workers race, the first key written wins and every one reads it back
+        self._db.execute(
+            "INSERT OR IGNORE INTO history_meta (name, value) VALUES ('hash_key', ?)", (secrets.token_hex(32),)
+        )
+        return self._db.execute("SELECT value FROM history_meta WHERE name = 'hash_key'").fetchone()[0]
+
+    def hash_username(self, username):
+        return hash_username(username, self.hash_key)
+
+    def record(self, endpoint, username, source, tier, latency):
+        """Queue one analysis for writing; never blocks"""
+        row = (time.time(), self.hash_username(username), endpoint, source, tier,
+               int(tier == "cache"), round(latency * 1000, 3))
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self, db, rows):
+        try:
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT INTO analysis_history (ts, user_hash, endpoint, source, tier, cache_hit, latency_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            db.execute("COMMIT")
+            self.written += len(rows)
+        except Exception as e:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            self.dropped += len(rows)
+            log.error("history_write_failed", rows=len(rows), error=str(e))
+
+    def _run(self):
+        db = connect(self.path)
+        stopping = False
+        while not stopping:
+            row = self._queue.get()
+            if row is None:
+                break
+            rows = [row]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                try:
+                    row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                rows.append(row)
+            self._write(db, rows)
+        db.close()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Write everything queued so far and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def query(self, user_hash=None, since=None, until=None, limit=50, cursor=None):
+        """Newest-first page of rows as dicts plus the cursor for the next page (None on the last)"""
+        clauses, params = [], []
+        if user_hash is not None:
+            clauses.append("user_hash = ?")
+            params.append(user_hash)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if cursor is not None:
+            ts, row_id = cursor
+            # The plain range on ts is what lets the index seek straight to the cursor
+            clauses.append("ts <= ? AND (ts < ? OR id < ?)")
+            params.extend((ts, ts, row_id))
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM analysis_history {where}ORDER BY ts DESC, id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+        items = [dict(zip(COLUMNS, row)) for row in rows[:limit]]
+        for item in items:
+            item["cache_hit"] = bool(item["cache_hit"])
+        return items, encode_cursor(items[-1]) if len(rows) > limit else None
+
+    def stats(self):
+        return {"written": self.written, "dropped": self.dropped, "pending": self._queue.qsize()}
+
+    def close(self):
+        self.stop()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
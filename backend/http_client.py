@@ -0,0 +1,139 @@
+import os
+import time
+
+import httpx
+
+# Overridable so tests and benchmarks can point at local fakes
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GEMINI_API_URL = os.getenv("GEMINI_API_URL", "https://generativelanguage.googleapis.com")
+
+# Request extensions for housekeeping calls that should not show up in the upstream metrics
+UNOBSERVED = {"unobserved": True}
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+class ObservedTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper timing every upstream exchange up to the response headers
+
+    Observations are labelled (upstream, status); transport failures such as
+    timeouts are recorded with status "error". Requests sent with the
+    UNOBSERVED extensions are passed straight through.
+    """
+
+    def __init__(self, transport, name, latency=None, in_flight=None):
+        self._transport = transport
+        self._name = name
+        self._latency = latency
+        self._in_flight = in_flight
+
+    async def handle_async_request(self, request):
+        if request.extensions.get("unobserved"):
+            return await self._transport.handle_async_request(request)
+        status = "error"
+        started = time.perf_counter()
+        if self._in_flight is not None:
+            self._in_flight.inc(self._name)
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            if self._in_flight is not None:
+                self._in_flight.dec(self._name)
+            if self._latency is not None:
+                self._latency.observe(time.perf_counter() - started, self._name, status)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class UpstreamClients:
+    """App-lifetime async HTTP clients with one keep-alive pool per upstream host
+
+    latency and in_flight are optional metrics (a histogram and a gauge)
+    labelled by upstream name, fed by every request on the pools.
+    """
+
+    def __init__(self, latency=None, in_flight=None):
+        self.max_connections = _env_int("HTTP_MAX_CONNECTIONS", 100)
+        self.max_keepalive = _env_int("HTTP_MAX_KEEPALIVE", 20)
+        self.keepalive_expiry = _env_float("HTTP_KEEPALIVE_EXPIRY", 30)
+        self.connect_timeout = _env_float("HTTP_CONNECT_TIMEOUT", 5)
+        self.github_timeout = _env_float("GITHUB_TIMEOUT", 15)
+        self.gemini_timeout = _env_float("GEMINI_TIMEOUT", 30)
+        self.latency = latency
+        self.in_flight = in_flight
+        self._github = None
+        self._gemini = None
+
+    def _build(self, name, base_url, timeout, headers=None):
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        transport = httpx.AsyncHTTPTransport(limits=limits)
+        if self.latency is not None or self.in_flight is not None:
+            transport = ObservedTransport(transport, name, self.latency, self.in_flight)
+        return httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            timeout=httpx.Timeout(timeout, connect=self.connect_timeout),
+            headers=headers,
+        )
+
+    @property
+    def github(self):
+        if self._github is None:
+            self._github = self._build("github", GITHUB_API_URL, self.github_timeout, {"User-Agent": "MediCheck-App/1.0"})
+        return self._github
+
+    @property
+    def gemini(self):
+        if self._gemini is None:
+            self._gemini = self._build("gemini", GEMINI_API_URL, self.gemini_timeout, {"Content-Type": "application/json"})
+        return self._gemini
+
+    def start(self):
+        """Create both pools up front so the first request does not pay for it"""
+        self.github
+        self.gemini
+
+    async def preconnect(self, timeout=None, github=None):
+        """Resolve, connect and TLS-handshake each upstream once so the pools hold a warm connection
+
+        By default each gets a HEAD on the base URL, the cheapest request both
+        hosts answer; its status is irrelevant and it is not recorded in the
+        metrics. `github`, a coroutine function taking the timeout, replaces
+        the GitHub HEAD with a request whose answer is of use (main passes
+        GitHubAPI.check_rate_limit). Returns {upstream: seconds or None on failure}.
+        """
+        timeout = self.connect_timeout if timeout is None else timeout
+        requests = {
+            "github": github or (lambda timeout: self.github.head("/", timeout=timeout, extensions=UNOBSERVED)),
+            "gemini": lambda timeout: self.gemini.head("/", timeout=timeout, extensions=UNOBSERVED),
+        }
+        timings = {}
+        for name, request in requests.items():
+            started = time.perf_counter()
+            try:
+                await request(timeout)
+                timings[name] = round(time.perf_counter() - started, 4)
+            except httpx.HTTPError:
+                timings[name] = None
+        return timings
+
+    async def aclose(self):
+        """Close pooled connections on shutdown"""
+        for client in (self._github, self._gemini):
+            if client is not None:
+                await client.aclose()
+        self._github = None
+        self._gemini = None
@@ -0,0 +1,112 @@
+import asyncio
+import itertools
+import secrets
+import time
+
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Lower runs first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class JobQueueFull(Exception):
+    """Raised by submit when max_pending jobs are already waiting"""
+
+
+class JobQueue:
+    """Bounded priority queue of analysis jobs drained by a fixed pool of worker tasks
+
+    Job records are plain dicts kept in `store`, any TTLCache-compatible
+    cache: an in-process TTLCache, or a SharedTTLCache so every worker
+    process can answer status requests. Records expire `ttl` seconds after
+    their last update. Within a priority, jobs run in submission order.
+    """
+
+    def __init__(self, run, store, workers=8, max_pending=1000, ttl=600):
+        self.run = run
+        self.store = store
+        self.workers = workers
+        self.ttl = ttl
+        self.completed = 0
+        self.failed = 0
+        self.running = 0
+        self._queue = asyncio.PriorityQueue(maxsize=max_pending)
+        self._order = itertools.count()
+        self._tasks = []
+
+    async def _save(self, record):
+        await self.store.aset(record["id"], dict(record), ttl=self.ttl)
+
+    async def submit(self, args, priority="normal"):
+        """Queue run(*args) and return the new job record; raises JobQueueFull"""
+        record = {
+            "id": secrets.token_urlsafe(16),
+            "status": QUEUED,
+            "priority": priority,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        if self._queue.full():
+            raise JobQueueFull(f"{self._queue.maxsize} jobs already pending")
+        # Stored before it is queued, so a worker's "running" write cannot be overtaken by this one
+        await self._save(record)
+        try:
+            self._queue.put_nowait((PRIORITIES[priority], next(self._order), record, args))
+        except asyncio.QueueFull:
+            await self.store.ainvalidate(record["id"])
+            raise JobQueueFull(f"{self._queue.maxsize} jobs already pending")
+        return record
+
+    async def get(self, job_id):
+        return await self.store.aget(job_id)
+
+    async def _work(self):
+        while True:
+            _, _, record, args = await self._queue.get()
+            record.update(status=RUNNING, started_at=time.time())
+            await self._save(record)
+            self.running += 1
+            try:
+                record.update(status=DONE, result=await self.run(*args))
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("analysis_job_failed", job_id=record["id"], error=str(e))
+                record.update(status=FAILED, error="Analysis failed")
+                self.failed += 1
+            finally:
+                self.running -= 1
+                record["finished_at"] = time.time()
+                await self._save(record)
+                self._queue.task_done()
+
+    def start(self):
+        if not self._tasks:
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self):
+        return {
+            "pending": self._queue.qsize(),
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "workers": self.workers,
+        }
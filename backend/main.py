@@ -1,499 +1,143 @@
-from fastapi import FastAPI, HTTPException
+import time
+# Taken before the other imports so the cold-start timer can fall back to it
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-import requests
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from typing import Optional
+import asyncio
+import hmac
+import httpx
 import json
+import math
 import os
+import re
+import threading
 from dotenv import load_dotenv
 
+import metrics
+import response_parser
+import star_verifier
+from analysis_cache import AnalysisCache, analysis_key
+from cache import TTLCache
+from cache_warmer import CacheWarmer, load_seeds
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from cold_start import ColdStartTimer, FirstRequestMiddleware
+from frontend_dist import FrontendDist
+from github_api import GitHubAPI
+from history import HistoryStore, decode_cursor
+from http_client import UpstreamClients
+from jobs import JobQueue, JobQueueFull
+from microbatch import BatchParseError, MicroBatcher
+from precompressed import PrecompressedAsset
+from rate_limit import ConcurrencyLimiter, LoadShedMiddleware, TokenBucketLimiter
+from prompts import (
+    JSON_INSTRUCTION, SECTIONS_INSTRUCTION, TokenUsage, compact_terms, output_budget, patient_line, truncated,
+)
+from response_parser import AnalysisParseError, PartialAnalysis, SectionParser, parse_analysis, parse_json_analysis
+from schemas import (
+    GITHUB_USERNAME_MAX_LENGTH,
+    GITHUB_USERNAME_PATTERN,
+    AnalysisJob,
+    AnalysisJobRequest,
+    AnalysisResult,
+    BatchRequest,
+    BatchResponse,
+    ErrorResponse,
+    HistoryPage,
+    SymptomRequest,
+    VerifyStarRequest,
+    VerifyStarResponse,
+)
+from singleflight import SingleFlight
+from star_verifier import StarVerifier
+from shared_cache import SharedTTLCache
+from stargazers import StargazerSync
+from structured_log import CorrelationMiddleware, LogPipeline, get_logger
+
 load_dotenv()
 
-app = FastAPI(title="MediCheck API", version="1.0.0")
+# Structured JSON logs, written by one background thread
+log_pipeline = LogPipeline(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    queue_size=int(os.getenv("LOG_QUEUE_SIZE", 10000)),
+    redact=[field.strip() for field in os.getenv("LOG_REDACT_FIELDS", "symptoms,body").split(",") if field.strip()],
+    redact_mode=os.getenv("LOG_REDACT_MODE", "mask"),
+    body_sample_rate=float(os.getenv("LOG_BODY_SAMPLE_RATE", 0)),
+    body_max_chars=int(os.getenv("LOG_BODY_MAX_CHARS", 500)),
+)
+log_pipeline.start()
+log = get_logger("medicheck")
+
+# Phase timings since process start: imported, started, warm, first_request
+cold_start = ColdStartTimer(IMPORT_STARTED)
+
+app = FastAPI(title="MediCheck API", version="1.0.0", default_response_class=ORJSONResponse)
+
+LANDING_PAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "index.html")
+landing_page = None
+
+def get_landing_page():
+    """Landing page body, hash and compressed variants, built once"""
+    global landing_page
+    if landing_page is None:
+        landing_page = PrecompressedAsset.from_file(LANDING_PAGE_PATH, "text/html")
+    return landing_page
+
+# Optional: serve the built React app (e.g. FRONTEND_DIST_DIR=../frontend/dist) instead of the landing page
+FRONTEND_DIST_DIR = os.getenv("FRONTEND_DIST_DIR")
+frontend_dist = FrontendDist(FRONTEND_DIST_DIR) if FRONTEND_DIST_DIR else None
 
 @app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>MediCheck - AI Healthcare Platform</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-        <script src="https://unpkg.com/axios/dist/axios.min.js"></script>
-        <script src="https://cdnjs.cloudflare.com/ajax/libs/three.js/r128/three.min.js"></script>
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-            * { font-family: 'Inter', sans-serif; }
-            .gradient-bg { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); }
-            .glass { backdrop-filter: blur(10px); background: rgba(255, 255, 255, 0.1); }
-            .animate-float { animation: float 6s ease-in-out infinite; }
-            @keyframes float { 0%, 100% { transform: translateY(0px); } 50% { transform: translateY(-20px); } }
-            #three-container { position: absolute; top: 0; left: 0; z-index: -1; }
-        </style>
-    </head>
-    <body class="bg-gray-50 overflow-x-hidden">
-        <!-- Navigation -->
-        <nav class="fixed top-0 w-full z-50 glass border-b border-white/20">
-            <div class="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
-                <div class="flex justify-between items-center h-16">
-                    <div class="flex items-center space-x-2">
-                        <i class="fas fa-heartbeat text-2xl text-blue-600"></i>
-                        <span class="text-xl font-bold text-gray-900">MediCheck</span>
-                    </div>
-                    <div class="hidden md:flex space-x-8">
-                        <a href="#" onclick="showPage('home')" class="nav-link text-gray-700 hover:text-blue-600 transition-colors">Home</a>
-                        <a href="#" onclick="showPage('checker')" class="nav-link text-gray-700 hover:text-blue-600 transition-colors">Symptom Checker</a>
-                        <a href="#" onclick="showPage('about')" class="nav-link text-gray-700 hover:text-blue-600 transition-colors">About</a>
-                        <a href="#" onclick="showPage('contact')" class="nav-link text-gray-700 hover:text-blue-600 transition-colors">Contact</a>
-                    </div>
-                    <div class="md:hidden">
-                        <button onclick="toggleMobileMenu()" class="text-gray-700">
-                            <i class="fas fa-bars text-xl"></i>
-                        </button>
-                    </div>
-                </div>
-            </div>
-            <div id="mobile-menu" class="hidden md:hidden bg-white/90 backdrop-blur-md">
-                <div class="px-2 pt-2 pb-3 space-y-1">
-                    <a href="#" onclick="showPage('home')" class="block px-3 py-2 text-gray-700">Home</a>
-                    <a href="#" onclick="showPage('checker')" class="block px-3 py-2 text-gray-700">Symptom Checker</a>
-                    <a href="#" onclick="showPage('about')" class="block px-3 py-2 text-gray-700">About</a>
-                    <a href="#" onclick="showPage('contact')" class="block px-3 py-2 text-gray-700">Contact</a>
-                </div>
-            </div>
-        </nav>
-
-        <!-- Three.js Background -->
-        <div id="three-container"></div>
-
-        <!-- Home Page -->
-        <div id="home-page" class="page min-h-screen pt-16">
-            <div class="relative min-h-screen flex items-center justify-center">
-                <div class="text-center z-10 px-4">
-                    <div class="animate-float mb-8">
-                        <i class="fas fa-stethoscope text-6xl text-blue-600 mb-4"></i>
-                    </div>
-                    <h1 class="text-5xl md:text-7xl font-bold text-gray-900 mb-6">
-                        AI-Powered <span class="text-blue-600">Healthcare</span>
-                    </h1>
-                    <p class="text-xl text-gray-600 mb-8 max-w-2xl mx-auto">
-                        Get instant symptom analysis and health recommendations powered by advanced AI technology
-                    </p>
-                    <button onclick="showPage('checker')" class="bg-blue-600 hover:bg-blue-700 text-white px-8 py-4 rounded-full text-lg font-semibold transition-all transform hover:scale-105 shadow-lg">
-                        Start Symptom Check <i class="fas fa-arrow-right ml-2"></i>
-                    </button>
-                </div>
-            </div>
-            
-            <!-- Features Section -->
-            <div class="py-20 bg-white">
-                <div class="max-w-7xl mx-auto px-4">
-                    <h2 class="text-4xl font-bold text-center text-gray-900 mb-16">Why Choose MediCheck?</h2>
-                    <div class="grid md:grid-cols-3 gap-8">
-                        <div class="text-center p-8 rounded-2xl bg-gradient-to-br from-blue-50 to-indigo-100 hover:shadow-xl transition-all">
-                            <i class="fas fa-brain text-4xl text-blue-600 mb-4"></i>
-                            <h3 class="text-xl font-semibold mb-4">AI-Powered Analysis</h3>
-                            <p class="text-gray-600">Advanced machine learning algorithms analyze your symptoms for accurate insights</p>
-                        </div>
-                        <div class="text-center p-8 rounded-2xl bg-gradient-to-br from-green-50 to-emerald-100 hover:shadow-xl transition-all">
-                            <i class="fas fa-shield-alt text-4xl text-green-600 mb-4"></i>
-                            <h3 class="text-xl font-semibold mb-4">Privacy First</h3>
-                            <p class="text-gray-600">Your health data is never stored. Complete privacy and confidentiality guaranteed</p>
-                        </div>
-                        <div class="text-center p-8 rounded-2xl bg-gradient-to-br from-purple-50 to-violet-100 hover:shadow-xl transition-all">
-                            <i class="fas fa-clock text-4xl text-purple-600 mb-4"></i>
-                            <h3 class="text-xl font-semibold mb-4">Instant Results</h3>
-                            <p class="text-gray-600">Get immediate health insights and recommendations in seconds</p>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        <!-- Symptom Checker Page -->
-        <div id="checker-page" class="page hidden min-h-screen pt-20">
-            <div class="max-w-4xl mx-auto px-4 py-12">
-                <div class="text-center mb-12">
-                    <i class="fas fa-user-md text-5xl text-blue-600 mb-4"></i>
-                    <h1 class="text-4xl font-bold text-gray-900 mb-4">AI Symptom Checker</h1>
-                    <p class="text-gray-600">Describe your symptoms and get AI-powered health insights</p>
-                </div>
-                
-                <div id="star-section" class="bg-gradient-to-r from-yellow-50 to-orange-50 border border-yellow-200 p-8 mb-8 rounded-2xl shadow-lg">
-                    <div class="text-center mb-6">
-                        <i class="fas fa-star text-4xl text-yellow-500 mb-4"></i>
-                        <h2 class="text-2xl font-bold text-gray-900 mb-2">GitHub Star Required</h2>
-                        <p class="text-gray-700">Support our open-source project to access the AI symptom checker</p>
-                    </div>
-                    
-                    <div class="text-center mb-6">
-                        <a href="https://github.com/sanatanisher01/Healthcare-symptoms" target="_blank" 
-                           class="inline-flex items-center bg-gray-900 hover:bg-gray-800 text-white px-6 py-3 rounded-full font-semibold transition-all transform hover:scale-105 shadow-lg">
-                            <i class="fab fa-github mr-2"></i> Star on GitHub
-                        </a>
-                    </div>
-                    
-                    <div class="max-w-md mx-auto">
-                        <div class="mb-4">
-                            <p class="text-sm text-gray-600 mb-2"><strong>Enter your GitHub username:</strong></p>
-                            <p class="text-xs text-gray-500">✅ Correct: <code class="bg-gray-100 px-2 py-1 rounded">sanatanisher01</code></p>
-                        </div>
-                        <div class="flex gap-3">
-                            <input type="text" id="username" placeholder="GitHub username" 
-                                   class="flex-1 p-4 border border-gray-300 rounded-xl focus:ring-2 focus:ring-blue-500 focus:border-transparent">
-                            <button onclick="verifyGitHubStar()" 
-                                    class="bg-blue-600 hover:bg-blue-700 text-white px-6 py-4 rounded-xl font-semibold transition-all">
-                                Verify
-                            </button>
-                        </div>
-                    </div>
-                </div>
-
-                <div id="symptom-form" class="bg-white rounded-2xl shadow-xl p-8 mb-8 opacity-50 pointer-events-none transition-all">
-                    <div class="space-y-6">
-                        <div>
-                            <label class="block text-sm font-semibold text-gray-700 mb-3">Describe your symptoms</label>
-                            <textarea id="symptoms" class="w-full p-4 border border-gray-300 rounded-xl focus:ring-2 focus:ring-blue-500 focus:border-transparent" 
-                                      rows="4" placeholder="e.g., fever, cough, sore throat, headache..."></textarea>
-                        </div>
-                        
-                        <div class="grid grid-cols-1 md:grid-cols-2 gap-6">
-                            <div>
-                                <label class="block text-sm font-semibold text-gray-700 mb-3">Age Group</label>
-                                <select id="age_group" class="w-full p-4 border border-gray-300 rounded-xl focus:ring-2 focus:ring-blue-500">
-                                    <option value="">Select age group</option>
-                                    <option value="Child">Child (0-12)</option>
-                                    <option value="Teen">Teen (13-19)</option>
-                                    <option value="Adult">Adult (20-64)</option>
-                                    <option value="Senior">Senior (65+)</option>
-                                </select>
-                            </div>
-                            
-                            <div>
-                                <label class="block text-sm font-semibold text-gray-700 mb-3">Gender</label>
-                                <select id="gender" class="w-full p-4 border border-gray-300 rounded-xl focus:ring-2 focus:ring-blue-500">
-                                    <option value="">Select gender</option>
-                                    <option value="Male">Male</option>
-                                    <option value="Female">Female</option>
-                                </select>
-                            </div>
-                        </div>
-                        
-                        <button onclick="checkSymptoms()" id="check-btn"
-                                class="w-full bg-gradient-to-r from-blue-600 to-purple-600 hover:from-blue-700 hover:to-purple-700 text-white py-4 px-6 rounded-xl font-semibold transition-all transform hover:scale-105 shadow-lg">
-                            ⭐ Star Repository First
-                        </button>
-                    </div>
-                </div>
-
-                <div id="results" class="bg-white rounded-2xl shadow-xl p-8 hidden">
-                    <h2 class="text-2xl font-bold text-gray-900 mb-6 flex items-center">
-                        <i class="fas fa-clipboard-list text-blue-600 mr-3"></i>Analysis Results
-                    </h2>
-                    <div id="results-content"></div>
-                    <div class="mt-8 p-6 bg-gradient-to-r from-yellow-50 to-orange-50 border-l-4 border-yellow-400 rounded-xl">
-                        <p class="text-sm text-gray-800 flex items-center">
-                            <i class="fas fa-exclamation-triangle text-yellow-600 mr-2"></i>
-                            <strong>Medical Disclaimer:</strong> This is not a medical diagnosis. Always consult healthcare professionals for proper medical advice.
-                        </p>
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        <!-- About Page -->
-        <div id="about-page" class="page hidden min-h-screen pt-20">
-            <div class="max-w-4xl mx-auto px-4 py-12">
-                <div class="text-center mb-12">
-                    <i class="fas fa-info-circle text-5xl text-blue-600 mb-4"></i>
-                    <h1 class="text-4xl font-bold text-gray-900 mb-4">About MediCheck</h1>
-                    <p class="text-xl text-gray-600">Revolutionizing healthcare with AI technology</p>
-                </div>
-                
-                <div class="bg-white rounded-2xl shadow-xl p-8 mb-8">
-                    <h2 class="text-2xl font-bold text-gray-900 mb-6">Our Mission</h2>
-                    <p class="text-gray-600 mb-6 leading-relaxed">
-                        MediCheck is dedicated to making healthcare more accessible through cutting-edge AI technology. 
-                        Our platform provides instant symptom analysis and health recommendations, helping users make 
-                        informed decisions about their health.
-                    </p>
-                    
-                    <div class="grid md:grid-cols-2 gap-8 mt-8">
-                        <div class="p-6 bg-blue-50 rounded-xl">
-                            <i class="fas fa-microscope text-3xl text-blue-600 mb-4"></i>
-                            <h3 class="text-xl font-semibold mb-3">Advanced AI</h3>
-                            <p class="text-gray-600">Powered by state-of-the-art machine learning models trained on medical data</p>
-                        </div>
-                        <div class="p-6 bg-green-50 rounded-xl">
-                            <i class="fas fa-users text-3xl text-green-600 mb-4"></i>
-                            <h3 class="text-xl font-semibold mb-3">Open Source</h3>
-                            <p class="text-gray-600">Built by the community, for the community. Transparent and collaborative development</p>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        <!-- Contact Page -->
-        <div id="contact-page" class="page hidden min-h-screen pt-20">
-            <div class="max-w-4xl mx-auto px-4 py-12">
-                <div class="text-center mb-12">
-                    <i class="fas fa-envelope text-5xl text-blue-600 mb-4"></i>
-                    <h1 class="text-4xl font-bold text-gray-900 mb-4">Contact Us</h1>
-                    <p class="text-xl text-gray-600">Get in touch with our team</p>
-                </div>
-                
-                <div class="bg-white rounded-2xl shadow-xl p-8">
-                    <div class="grid md:grid-cols-2 gap-8">
-                        <div>
-                            <h2 class="text-2xl font-bold text-gray-900 mb-6">Get in Touch</h2>
-                            <div class="space-y-4">
-                                <div class="flex items-center">
-                                    <i class="fab fa-github text-2xl text-gray-600 mr-4"></i>
-                                    <a href="https://github.com/sanatanisher01/Healthcare-symptoms" class="text-blue-600 hover:underline">
-                                        GitHub Repository
-                                    </a>
-                                </div>
-                                <div class="flex items-center">
-                                    <i class="fas fa-envelope text-2xl text-gray-600 mr-4"></i>
-                                    <a href="mailto:aryansanatani01@gmail.com" class="text-blue-600 hover:underline">aryansanatani01@gmail.com</a>
-                                </div>
-                                <div class="flex items-center">
-                                    <i class="fas fa-globe text-2xl text-gray-600 mr-4"></i>
-                                    <a href="https://healthcare-symptoms.onrender.com" class="text-blue-600 hover:underline">healthcare-symptoms.onrender.com</a>
-                                </div>
-                            </div>
-                        </div>
-                        <div>
-                            <h3 class="text-xl font-semibold mb-4">Quick Links</h3>
-                            <div class="space-y-2">
-                                <a href="#" onclick="showPage('home')" class="block text-blue-600 hover:underline">Home</a>
-                                <a href="#" onclick="showPage('checker')" class="block text-blue-600 hover:underline">Symptom Checker</a>
-                                <a href="#" onclick="showPage('about')" class="block text-blue-600 hover:underline">About</a>
-                                <a href="https://github.com/sanatanisher01/Healthcare-symptoms" class="block text-blue-600 hover:underline">GitHub</a>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        <script>
-            // Global variables
-            let isVerified = localStorage.getItem('medicheck_verified') === 'true';
-            let githubUsername = localStorage.getItem('medicheck_username') || '';
-            let scene, camera, renderer, particles;
-
-            // Initialize Three.js background
-            function initThreeJS() {
-                scene = new THREE.Scene();
-                camera = new THREE.PerspectiveCamera(75, window.innerWidth / window.innerHeight, 0.1, 1000);
-                renderer = new THREE.WebGLRenderer({ alpha: true });
-                renderer.setSize(window.innerWidth, window.innerHeight);
-                document.getElementById('three-container').appendChild(renderer.domElement);
-
-                // Create floating particles
-                const geometry = new THREE.BufferGeometry();
-                const positions = [];
-                const colors = [];
-
-                for (let i = 0; i < 1000; i++) {
-                    positions.push((Math.random() - 0.5) * 2000);
-                    positions.push((Math.random() - 0.5) * 2000);
-                    positions.push((Math.random() - 0.5) * 2000);
-
-                    colors.push(0.3 + Math.random() * 0.7);
-                    colors.push(0.5 + Math.random() * 0.5);
-                    colors.push(1);
-                }
-
-                geometry.setAttribute('position', new THREE.Float32BufferAttribute(positions, 3));
-                geometry.setAttribute('color', new THREE.Float32BufferAttribute(colors, 3));
-
-                const material = new THREE.PointsMaterial({ size: 2, vertexColors: true, transparent: true, opacity: 0.6 });
-                particles = new THREE.Points(geometry, material);
-                scene.add(particles);
-
-                camera.position.z = 1000;
-                animate();
-            }
-
-            function animate() {
-                requestAnimationFrame(animate);
-                particles.rotation.x += 0.0005;
-                particles.rotation.y += 0.001;
-                renderer.render(scene, camera);
-            }
-
-            // Navigation functions
-            function showPage(pageId) {
-                document.querySelectorAll('.page').forEach(page => page.classList.add('hidden'));
-                document.getElementById(pageId + '-page').classList.remove('hidden');
-                
-                if (pageId === 'checker' && isVerified) {
-                    document.getElementById('star-section').style.display = 'none';
-                    document.getElementById('symptom-form').classList.remove('opacity-50', 'pointer-events-none');
-                    document.getElementById('check-btn').textContent = 'Analyze Symptoms';
-                }
-            }
-
-            function toggleMobileMenu() {
-                document.getElementById('mobile-menu').classList.toggle('hidden');
-            }
-
-            // Star verification with persistence
-            async function verifyGitHubStar() {
-                const username = document.getElementById('username').value.trim();
-                if (!username) {
-                    showNotification('Please enter your GitHub username', 'warning');
-                    return;
-                }
-
-                try {
-                    const response = await axios.post('/verify-star', { github_username: username });
-                    if (response.data.starred) {
-                        isVerified = true;
-                        githubUsername = username;
-                        
-                        // Store in localStorage for persistence
-                        localStorage.setItem('medicheck_verified', 'true');
-                        localStorage.setItem('medicheck_username', username);
-                        
-                        document.getElementById('star-section').style.display = 'none';
-                        document.getElementById('symptom-form').classList.remove('opacity-50', 'pointer-events-none');
-                        document.getElementById('check-btn').textContent = 'Analyze Symptoms';
-                        
-                        showNotification('✅ Verification successful! You can now use the symptom checker.', 'success');
-                    } else {
-                        showNotification(`❌ ${response.data.message}`, 'error');
-                    }
-                } catch (error) {
-                    showNotification('❌ Unable to verify. Please try again.', 'error');
-                }
-            }
-
-            // Symptom checking
-            async function checkSymptoms() {
-                if (!isVerified) {
-                    showNotification('Please verify your GitHub star first!', 'warning');
-                    return;
-                }
-
-                const symptoms = document.getElementById('symptoms').value;
-                const age_group = document.getElementById('age_group').value;
-                const gender = document.getElementById('gender').value;
-
-                if (!symptoms || !age_group || !gender) {
-                    showNotification('Please fill in all fields', 'warning');
-                    return;
-                }
-
-                document.getElementById('check-btn').innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i>Analyzing...';
-
-                try {
-                    const response = await axios.post(`/check-symptoms?github_username=${githubUsername}`, {
-                        symptoms, age_group, gender
-                    });
-
-                    const resultsContent = `
-                        <div class="space-y-8">
-                            ${response.data.source ? `
-                                <div class="bg-gradient-to-r from-purple-50 to-pink-50 p-4 rounded-xl border border-purple-200">
-                                    <p class="text-sm text-purple-700 flex items-center">
-                                        <i class="fas fa-robot text-purple-600 mr-2"></i>
-                                        <strong>Analysis Source:</strong> ${response.data.source}
-                                    </p>
-                                </div>
-                            ` : ''}
-                            
-                            <div class="bg-gradient-to-r from-blue-50 to-indigo-50 p-6 rounded-xl">
-                                <h3 class="text-xl font-bold text-gray-800 mb-4 flex items-center">
-                                    <i class="fas fa-search text-blue-600 mr-3"></i>Possible Diagnoses
-                                </h3>
-                                <div class="space-y-3">
-                                    ${response.data.diagnoses.map(d => `
-                                        <div class="bg-white p-4 rounded-lg border-l-4 border-blue-500 shadow-sm">
-                                            <i class="fas fa-stethoscope text-blue-600 mr-2"></i>${d}
-                                        </div>
-                                    `).join('')}
-                                </div>
-                            </div>
-                            
-                            <div class="bg-gradient-to-r from-green-50 to-emerald-50 p-6 rounded-xl">
-                                <h3 class="text-xl font-bold text-gray-800 mb-4 flex items-center">
-                                    <i class="fas fa-lightbulb text-green-600 mr-3"></i>Recommended Next Steps
-                                </h3>
-                                <div class="space-y-3">
-                                    ${response.data.recommendations.map(r => `
-                                        <div class="bg-white p-4 rounded-lg border-l-4 border-green-500 shadow-sm">
-                                            <i class="fas fa-check-circle text-green-600 mr-2"></i>${r}
-                                        </div>
-                                    `).join('')}
-                                </div>
-                            </div>
-                        </div>
-                    `;
-
-                    document.getElementById('results-content').innerHTML = resultsContent;
-                    document.getElementById('results').classList.remove('hidden');
-                    document.getElementById('results').scrollIntoView({ behavior: 'smooth' });
-                } catch (error) {
-                    showNotification('Error analyzing symptoms. Please try again.', 'error');
-                } finally {
-                    document.getElementById('check-btn').innerHTML = 'Analyze Symptoms';
-                }
-            }
-
-            // Notification system
-            function showNotification(message, type) {
-                const notification = document.createElement('div');
-                const bgColor = type === 'success' ? 'bg-green-500' : type === 'error' ? 'bg-red-500' : 'bg-yellow-500';
-                
-                notification.className = `fixed top-20 right-4 ${bgColor} text-white px-6 py-3 rounded-lg shadow-lg z-50 transform translate-x-full transition-transform`;
-                notification.textContent = message;
-                
-                document.body.appendChild(notification);
-                
-                setTimeout(() => notification.classList.remove('translate-x-full'), 100);
-                setTimeout(() => {
-                    notification.classList.add('translate-x-full');
-                    setTimeout(() => document.body.removeChild(notification), 300);
-                }, 3000);
-            }
-
-            // Disable right-click context menu
-            document.addEventListener('contextmenu', e => e.preventDefault());
-            
-            // Initialize on load
-            window.addEventListener('load', () => {
-                initThreeJS();
-                
-                // Check if already verified
-                if (isVerified && document.getElementById('username')) {
-                    document.getElementById('username').value = githubUsername;
-                }
-            });
-
-            // Handle window resize
-            window.addEventListener('resize', () => {
-                if (camera && renderer) {
-                    camera.aspect = window.innerWidth / window.innerHeight;
-                    camera.updateProjectionMatrix();
-                    renderer.setSize(window.innerWidth, window.innerHeight);
-                }
-            });
-        </script>
-    </body>
-    </html>
-    """
-    return html_content
+async def serve_frontend(request: Request):
+    if frontend_dist is not None:
+        return frontend_dist.index.response(request)
+    return get_landing_page().response(request)
+
+@app.exception_handler(404)
+async def not_found(request: Request, exc):
+    """Static files and SPA routes from the React build, JSON 404 otherwise"""
+    # Starlette sets scope["endpoint"] once a route matches, so a 404 raised by a handler (say an
+    # unknown job id) stays a JSON 404 even for browsers; only unrouted paths reach the SPA
+    if frontend_dist is not None and "endpoint" not in request.scope:
+        response = frontend_dist.response(request)
+        if response is not None:
+            return response
+    return JSONResponse({"detail": exc.detail}, status_code=404, headers=getattr(exc, "headers", None))
 
 @app.get("/api")
 async def api_status():
     return {"message": "MediCheck API is running"}
 
+@app.get("/api/stats")
+async def api_stats():
+    """Cache, rate-limit and circuit-breaker counters"""
+    return {
+        "gemini_breaker": gemini_breaker.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "star_cache": star_checker.cache.stats(),
+        "github": github_api.stats(),
+        "stargazers": len(stargazer_sync),
+        "analysis_jobs": analysis_jobs.stats(),
+        "history": history.stats() if history else None,
+        "gemini_tokens": gemini_tokens.stats(),
+        "cache_warmer": cache_warmer.stats() if cache_warmer else None,
+        "startup": cold_start.stats(),
+        "rate_limits": {
+            "ip": ip_limiter.stats() if ip_limiter else None,
+            "username": username_limiter.stats() if username_limiter else None,
+            "concurrency": concurrency_limiter.stats() if MAX_IN_FLIGHT > 0 else None,
+        },
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus text exposition of request, upstream and fallback metrics"""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -503,18 +147,312 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics: per-route and upstream latency, in-flight requests, analysis tiers
+request_latency = metrics.Histogram(
+    "medicheck_request_duration_seconds", "HTTP request latency by route", ("route", "method", "status"),
+)
+requests_in_flight = metrics.Gauge("medicheck_requests_in_flight", "HTTP requests currently being served")
+upstream_latency = metrics.Histogram(
+    "medicheck_upstream_duration_seconds", "Upstream latency to response headers by status", ("upstream", "status"),
+)
+upstream_in_flight = metrics.Gauge("medicheck_upstream_in_flight", "Upstream requests currently open", ("upstream",))
+analyses_total = metrics.Counter("medicheck_analyses_total", "Symptom analyses by answering tier", ("tier",))
+fallbacks_total = metrics.Counter("medicheck_fallbacks_total", "Fallback analyses by reason and source", ("reason", "source"))
+metrics.Gauge("medicheck_log_records_dropped", "Log records dropped because the log queue was full",
+              fn=lambda: log_pipeline.dropped)
+app.add_middleware(metrics.MetricsMiddleware, latency=request_latency, in_flight=requests_in_flight)
+app.add_middleware(CorrelationMiddleware)
+metrics.Gauge("medicheck_startup_seconds", "Seconds from process start to each cold-start phase", ("phase",),
+              fn=lambda: {(phase,): seconds for phase, seconds in cold_start.marks.items()})
+app.add_middleware(FirstRequestMiddleware, timer=cold_start,
+                   on_first=lambda timer: log.info("cold_start", **timer.stats()))
+
+# Load shedding: past MAX_IN_FLIGHT concurrent requests, answer 503 at once instead of queueing (0 disables)
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", 256))
+if MAX_IN_FLIGHT > 0:
+    concurrency_limiter = ConcurrencyLimiter(MAX_IN_FLIGHT, retry_after=float(os.getenv("SHED_RETRY_AFTER", 1)))
+    app.add_middleware(LoadShedMiddleware, limiter=concurrency_limiter, exempt=("/api", "/metrics"))
+    metrics.Counter("medicheck_requests_shed_total", "Requests refused with 503 by the in-flight limit",
+                    fn=lambda: concurrency_limiter.shed)
+
+# Per-IP and per-username token buckets for the API endpoints (a rate of 0 disables one)
+def token_buckets(prefix, rate, burst):
+    rate = float(os.getenv(f"{prefix}_RATE", rate))
+    if rate <= 0:
+        return None
+    return TokenBucketLimiter(
+        rate,
+        float(os.getenv(f"{prefix}_BURST", burst)),
+        max_keys=int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000)),
+        idle_seconds=float(os.getenv("RATE_LIMIT_IDLE_SECONDS", 600)),
+    )
+
+ip_limiter = token_buckets("RATE_LIMIT_IP", 5, 20)
+username_limiter = token_buckets("RATE_LIMIT_USERNAME", 1, 10)
+# Proxies in front of the app that append to X-Forwarded-For. Entries left of the ones they added
+# come from the client and can be forged, so the client address is the entry RATE_LIMIT_TRUSTED_PROXIES
+# from the right. Defaults to 1 on Render (whose proxy appends one), else 0: the socket address.
+# RATE_LIMIT_TRUST_PROXY=true is the older spelling of 1
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv(
+    "RATE_LIMIT_TRUSTED_PROXIES",
+    1 if os.getenv("RATE_LIMIT_TRUST_PROXY", "").lower() == "true" or os.getenv("RENDER") else 0,
+))
+metrics.Counter("medicheck_rate_limited_total", "Requests refused with 429 by token bucket", ("scope",),
+                fn=lambda: {(scope,): limiter.limited for scope, limiter in (("ip", ip_limiter), ("username", username_limiter))
+                            if limiter is not None})
+
 # API configurations
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 
-# Debug environment variables
-print(f"🔑 Gemini API Key loaded: {bool(GEMINI_API_KEY)}")
-print(f"🔑 GitHub Token loaded: {bool(GITHUB_TOKEN)}")
+log.info("credentials_loaded", gemini_api_key=bool(GEMINI_API_KEY), github_token=bool(GITHUB_TOKEN))
+
+# Shared upstream connection pools
+upstream = UpstreamClients(latency=upstream_latency, in_flight=upstream_in_flight)
+
+# Quota-aware GitHub access with ETag revalidation
+github_api = GitHubAPI(
+    upstream,
+    token=GITHUB_TOKEN,
+    reserve=int(os.getenv("GITHUB_RATE_RESERVE", 0)),
+    slowdown_fraction=float(os.getenv("GITHUB_RATE_SLOWDOWN_FRACTION", 0.1)),
+    max_wait=float(os.getenv("GITHUB_MAX_QUEUE_WAIT", 5)),
+)
+
+# Background-synced stargazer set; per-user lookups only for names not yet in it
+STARGAZER_SYNC_ENABLED = os.getenv("STARGAZER_SYNC_ENABLED", "true").lower() == "true"
+stargazer_sync = StargazerSync(
+    github_api,
+    star_verifier.REPO_OWNER,
+    star_verifier.REPO_NAME,
+    interval=float(os.getenv("STARGAZER_SYNC_INTERVAL", 300)),
+)
+
+# Cached GitHub star verification shared by /verify-star and /check-symptoms;
+# with STAR_CACHE_PATH set, answers live in SQLite and are shared by every worker
+STAR_CACHE_SIZE = int(os.getenv("STAR_CACHE_SIZE", 10000))
+STAR_CACHE_TTL_POSITIVE = float(os.getenv("STAR_CACHE_TTL_POSITIVE", 3600))
+STAR_CACHE_PATH = os.getenv("STAR_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "star_cache.db"))
+star_checker = StarVerifier(
+    github_api,
+    maxsize=STAR_CACHE_SIZE,
+    ttl_positive=STAR_CACHE_TTL_POSITIVE,
+    ttl_negative=float(os.getenv("STAR_CACHE_TTL_NEGATIVE", 60)),
+    ttl_not_found=float(os.getenv("STAR_CACHE_TTL_NOT_FOUND", 600)),
+    stargazers=stargazer_sync if STARGAZER_SYNC_ENABLED else None,
+    cache=SharedTTLCache(
+        STAR_CACHE_PATH,
+        "star_status",
+        maxsize=STAR_CACHE_SIZE,
+        ttl=STAR_CACHE_TTL_POSITIVE,
+        local_ttl=float(os.getenv("STAR_CACHE_LOCAL_TTL", 5)),
+    ) if STAR_CACHE_PATH else None,
+)
 
-@app.post("/verify-star")
-async def verify_star(request: dict):
+# Normalized analysis cache: memory tier plus SQLite tier that survives restarts
+analysis_cache = AnalysisCache(
+    os.getenv("ANALYSIS_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_cache.db")),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL", 6 * 3600)),
+    memory_size=int(os.getenv("ANALYSIS_CACHE_SIZE", 5000)),
+    disk_rows=int(os.getenv("ANALYSIS_CACHE_DISK_ROWS", 100000)),
+)
+
+# Offline symptom engine: always the fallback, optionally the first tier. Built on first use or by
+# the start-up warm-up, since importing it pulls in numpy
+symptom_engine = None
+symptom_engine_lock = threading.Lock()
+
+def get_symptom_engine():
+    global symptom_engine
+    if symptom_engine is None:
+        with symptom_engine_lock:
+            if symptom_engine is None:
+                from symptom_engine import DEFAULT_KNOWLEDGE_PATH, SymptomEngine
+                symptom_engine = SymptomEngine.from_file(os.getenv("SYMPTOM_KNOWLEDGE_PATH") or DEFAULT_KNOWLEDGE_PATH)
+    return symptom_engine
+
+OFFLINE_FIRST_CONFIDENCE = float(os.getenv("OFFLINE_FIRST_CONFIDENCE", 0))
+
+# Identical in-flight analyses share one upstream call
+analysis_flights = SingleFlight()
+
+# Circuit breaker with adaptive timeouts (and optional hedging) around Gemini
+gemini_breaker = CircuitBreaker(
+    "gemini",
+    failure_rate=float(os.getenv("GEMINI_BREAKER_FAILURE_RATE", 0.5)),
+    min_calls=int(os.getenv("GEMINI_BREAKER_MIN_CALLS", 20)),
+    slow_call_seconds=float(os.getenv("GEMINI_BREAKER_SLOW_SECONDS", 10)),
+    open_seconds=float(os.getenv("GEMINI_BREAKER_OPEN_SECONDS", 30)),
+    min_timeout=float(os.getenv("GEMINI_MIN_TIMEOUT", 2)),
+    max_timeout=upstream.gemini_timeout,
+    hedge=os.getenv("GEMINI_HEDGE", "false").lower() == "true",
+    hedge_percentile=float(os.getenv("GEMINI_HEDGE_PERCENTILE", 0.95)),
+    exclude=(BatchParseError, AnalysisParseError),
+)
+
+# Optional micro-batching: concurrent analyses share one Gemini prompt
+GEMINI_MICROBATCH = os.getenv("GEMINI_MICROBATCH", "false").lower() == "true"
+gemini_batcher = MicroBatcher(
+    # A combined prompt takes longer than the single-call latency the timeout adapts to
+    lambda items: gemini_breaker.call(gemini_batch_analysis, items, hedge=False, timeout=gemini_breaker.max_timeout),
+    lambda item: gemini_breaker.call(gemini_analysis, *item),
+    window=float(os.getenv("GEMINI_MICROBATCH_WINDOW_MS", 20)) / 1000,
+    max_items=int(os.getenv("GEMINI_MICROBATCH_MAX", 16)),
+) if GEMINI_MICROBATCH else None
+
+# Gemini token usage by call kind (single, batch, stream), from each response's usageMetadata;
+# maxOutputTokens scales with the number of symptom terms up to GEMINI_MAX_OUTPUT_TOKENS
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", 300))
+gemini_tokens = TokenUsage()
+gemini_output_tokens = metrics.Histogram(
+    "medicheck_gemini_output_tokens", "Output tokens per Gemini response by call kind", ("call",),
+    buckets=(25, 50, 100, 150, 200, 300, 600, 1200, 2400),
+)
+metrics.Counter("medicheck_gemini_tokens_total", "Gemini tokens by call kind and direction", ("call", "kind"),
+                fn=lambda: {**{(call, "prompt"): tokens for call, tokens in gemini_tokens.prompt_tokens.items()},
+                            **{(call, "output"): tokens for call, tokens in gemini_tokens.output_tokens.items()}})
+metrics.Counter("medicheck_gemini_truncated_total", "Gemini responses cut off by maxOutputTokens", ("call",),
+                fn=lambda: {(call,): count for call, count in gemini_tokens.truncated.items()})
+
+def record_gemini_usage(call: str, response: dict, budget: int):
+    prompt_tokens, output_tokens = gemini_tokens.record(call, response)
+    gemini_output_tokens.observe(output_tokens, call)
+    log.debug("gemini_usage", call=call, prompt_tokens=prompt_tokens, output_tokens=output_tokens, budget=budget)
+
+# Scrape-time gauges over state the components already keep
+metrics.Gauge("medicheck_github_rate_limit_remaining", "GitHub core requests left in the current window",
+              fn=lambda: github_api.remaining)
+metrics.Gauge("medicheck_github_rate_limit_reset_seconds", "Seconds until the GitHub rate-limit window resets",
+              fn=lambda: None if github_api.reset_at is None else max(0.0, github_api.reset_at - time.time()))
+metrics.Gauge("medicheck_gemini_in_flight", "Distinct Gemini analyses in flight after coalescing",
+              fn=lambda: len(analysis_flights))
+metrics.Gauge("medicheck_gemini_breaker_state", "1 for the Gemini circuit breaker's current state", ("state",),
+              fn=lambda: {(gemini_breaker.state,): 1})
+
+# Batch endpoint limits
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 500))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+
+# Asynchronous analysis jobs (POST /analyses, GET /analyses/{id}); set ANALYSIS_JOB_STORE_PATH
+# when running several workers so any of them can answer a status request
+ANALYSIS_JOB_TTL = float(os.getenv("ANALYSIS_JOB_TTL", 600))
+ANALYSIS_JOB_MAX_PENDING = int(os.getenv("ANALYSIS_JOB_MAX_PENDING", 1000))
+ANALYSIS_JOB_STORE_PATH = os.getenv("ANALYSIS_JOB_STORE_PATH", "")
+analysis_jobs = JobQueue(
+    lambda username, *args: recorded_analysis("analysis_job", username, *args),
+    SharedTTLCache(ANALYSIS_JOB_STORE_PATH, "analysis_jobs", maxsize=1000, ttl=ANALYSIS_JOB_TTL, local_ttl=0)
+    if ANALYSIS_JOB_STORE_PATH else TTLCache(maxsize=ANALYSIS_JOB_MAX_PENDING * 10, ttl=ANALYSIS_JOB_TTL),
+    workers=int(os.getenv("ANALYSIS_JOB_WORKERS", 8)),
+    max_pending=ANALYSIS_JOB_MAX_PENDING,
+    ttl=ANALYSIS_JOB_TTL,
+)
+metrics.Gauge("medicheck_analysis_jobs", "Analysis jobs waiting or running", ("state",),
+              fn=lambda: {("pending",): analysis_jobs.stats()["pending"], ("running",): analysis_jobs.running})
+
+# Append-only history of analyses served, written in batches by a background thread (HISTORY_PATH=""
+# disables). Usernames are stored as keyed hashes: HISTORY_HASH_KEY, else a random key kept in the
+# database. GET /api/history is only served with HISTORY_API_TOKEN set, to callers presenting it
+HISTORY_PATH = os.getenv("HISTORY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_history.db"))
+HISTORY_HASH_KEY = os.getenv("HISTORY_HASH_KEY") or None
+HISTORY_API_TOKEN = os.getenv("HISTORY_API_TOKEN") or None
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", 500))
+history = HistoryStore(
+    HISTORY_PATH,
+    hash_key=HISTORY_HASH_KEY,
+    batch_size=int(os.getenv("HISTORY_BATCH_SIZE", 500)),
+    flush_interval=float(os.getenv("HISTORY_FLUSH_SECONDS", 1)),
+    queue_size=int(os.getenv("HISTORY_QUEUE_SIZE", 10000)),
+) if HISTORY_PATH else None
+if history is not None:
+    metrics.Counter("medicheck_history_rows_total", "Analysis history rows by outcome", ("outcome",),
+                    fn=lambda: {("written",): history.written, ("dropped",): history.dropped})
+
+# Optional cache warm-up: keep analyses of common inputs from a seed file cached, refreshed before
+# they expire, within an hourly Gemini call budget. One worker at a time runs it, elected through a
+# lease row next to the analysis cache, and the budget is shared by all of them
+CACHE_WARM_SEED_PATH = os.getenv("CACHE_WARM_SEED_PATH", "")
+cache_warmer = CacheWarmer(
+    load_seeds(CACHE_WARM_SEED_PATH),
+    lambda *args: refresh_analysis(*args),
+    lambda args: analysis_cache.ttl_left(analysis_key(*args)),
+    interval=float(os.getenv("CACHE_WARM_INTERVAL", 900)),
+    refresh_before=float(os.getenv("CACHE_WARM_REFRESH_BEFORE", 3600)),
+    rate=float(os.getenv("CACHE_WARM_RATE", 0.5)),
+    budget=float(os.getenv("CACHE_WARM_BUDGET", 200)),
+    lease_path=analysis_cache.path,
+) if CACHE_WARM_SEED_PATH and GEMINI_API_KEY else None
+if cache_warmer is not None:
+    metrics.Counter("medicheck_cache_warm_refreshed_total", "Seed analyses recomputed by the cache warmer",
+                    fn=lambda: cache_warmer.refreshed)
+
+# Start-up warm-up run in the background, so serving starts without waiting for it
+UPSTREAM_PRECONNECT = os.getenv("UPSTREAM_PRECONNECT", "true").lower() == "true"
+ANALYSIS_CACHE_PRELOAD = int(os.getenv("ANALYSIS_CACHE_PRELOAD", 1000))
+warm_up_task = None
+
+async def warm_up():
+    """Connect to the upstreams, build the symptom engine and fill the memory cache tier from SQLite"""
+    async def preconnect():
+        return await upstream.preconnect(github=github_api.check_rate_limit) if UPSTREAM_PRECONNECT else {}
+    try:
+        timings, _, preloaded = await asyncio.gather(
+            preconnect(),
+            asyncio.to_thread(get_symptom_engine),
+            analysis_cache.apreload(ANALYSIS_CACHE_PRELOAD),
+        )
+    except Exception as e:
+        log.warning("warm_up_failed", error=str(e))
+        return
+    cold_start.mark("warm")
+    log.info("warm_up_done", preconnect=timings, analysis_cache_preloaded=preloaded, **cold_start.stats())
+
+@app.on_event("startup")
+async def startup():
+    global warm_up_task
+    log_pipeline.start()
+    upstream.start()
+    get_landing_page()
+    analysis_jobs.start()
+    if history is not None:
+        history.start()
+    if STARGAZER_SYNC_ENABLED:
+        stargazer_sync.start()
+    if cache_warmer is not None:
+        cache_warmer.start()
+    if warm_up_task is None:
+        warm_up_task = asyncio.get_running_loop().create_task(warm_up())
+    cold_start.mark("started")
+
+@app.on_event("shutdown")
+async def shutdown():
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+        await asyncio.gather(warm_up_task, return_exceptions=True)
+    await stargazer_sync.stop()
+    if cache_warmer is not None:
+        await cache_warmer.stop()
+    await analysis_jobs.stop()
+    if history is not None:
+        await asyncio.to_thread(history.close)
+    await upstream.aclose()
+    analysis_cache.close()
+    if STAR_CACHE_PATH:
+        star_checker.cache.close()
+    log_pipeline.stop()
+
+def github_username_query():
+    return Query(None, max_length=GITHUB_USERNAME_MAX_LENGTH, regex=GITHUB_USERNAME_PATTERN,
+                 description="GitHub username that has starred the repository")
+
+# Documented error bodies for the gated analysis endpoints
+GATED_RESPONSES = {403: {"model": ErrorResponse}, 429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}}
+
+@app.post("/verify-star", response_model=VerifyStarResponse, operation_id="verify_star",
+          responses={429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
+async def verify_star(request: VerifyStarRequest, client: Request):
     """Check if user has starred the repository"""
-    username = request.get("github_username", "").strip()
+    username = request.github_username
+    enforce_rate_limits(client, username)
     
     # Test bypass
     if username.lower() in ["test", "demo"]:
@@ -529,48 +467,50 @@ async def verify_star(request: dict):
         return {"starred": False, "message": "This username is restricted. Please use your own GitHub username."}
     
     try:
-        # First check if user exists
-        user_url = f"https://api.github.com/users/{username}"
-        headers = {"User-Agent": "MediCheck-App/1.0"}
-        
-        if GITHUB_TOKEN:
-            headers["Authorization"] = f"token {GITHUB_TOKEN}"
-        
-        print(f"Checking user: {username}")
-        user_response = requests.get(user_url, headers=headers, timeout=15)
-        print(f"User API status: {user_response.status_code}")
-        
-        if user_response.status_code != 200:
-            return {"starred": False, "message": f"GitHub user '{username}' not found"}
-        
-        # Check if user starred the repo
-        star_url = f"https://api.github.com/users/{username}/starred/sanatanisher01/Healthcare-symptoms"
-        star_response = requests.get(star_url, headers=headers, timeout=15)
+        log.info("verify_star", username=username)
+        # An explicit re-check should notice a star added since the last negative answer
+        status, status_code = await star_checker.check(username, refresh_negative=True)
         
-        print(f"Star API status: {star_response.status_code}")
-        print(f"Rate limit remaining: {star_response.headers.get('X-RateLimit-Remaining', 'unknown')}")
-        
-        if star_response.status_code == 204:
+        if status == star_verifier.STARRED:
             return {"starred": True, "message": "Access granted!"}
-        elif star_response.status_code == 404:
+        elif status == star_verifier.USER_NOT_FOUND:
+            return {"starred": False, "message": f"GitHub user '{username}' not found"}
+        elif status == star_verifier.NOT_STARRED:
             return {"starred": False, "message": "Repository not starred. Please star it first!"}
-        elif star_response.status_code == 403:
+        elif status == star_verifier.RATE_LIMITED:
             return {"starred": False, "message": "Rate limit exceeded. Try again later."}
         else:
-            return {"starred": False, "message": f"Verification failed (Status: {star_response.status_code})"}
+            return {"starred": False, "message": f"Verification failed (Status: {status_code})"}
             
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         return {"starred": False, "message": "Request timeout. Please try again."}
-    except requests.exceptions.ConnectionError:
+    except httpx.TransportError:
         return {"starred": False, "message": "Connection error. Check your internet."}
     except Exception as e:
-        print(f"Star verification error: {str(e)}")
+        log.error("verify_star_failed", username=username, error=str(e), exc_info=True)
         return {"starred": False, "message": f"Error: {str(e)[:50]}..."}
 
-@app.post("/check-symptoms")
-async def check_symptoms(request: dict, github_username: str = None):
-    """Analyze symptoms - requires GitHub star verification"""
-    
+def client_ip(client: Request):
+    if RATE_LIMIT_TRUSTED_PROXIES > 0:
+        forwarded = [entry.strip() for header in client.headers.getlist("x-forwarded-for") for entry in header.split(",")]
+        forwarded = [entry for entry in forwarded if entry]
+        if len(forwarded) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return forwarded[-RATE_LIMIT_TRUSTED_PROXIES]
+    return client.client.host if client.client else ""
+
+def enforce_rate_limits(client: Request, username: str = None, cost: int = 1):
+    """Raise 429 with Retry-After once the caller's IP or username bucket is empty"""
+    for scope, limiter, key in (("ip", ip_limiter, client_ip(client)),
+                                ("username", username_limiter, username.lower() if username else None)):
+        if limiter is None or not key:
+            continue
+        wait = limiter.take(key, cost)
+        if wait:
+            raise HTTPException(status_code=429, detail="Too many requests, please slow down",
+                                headers={"Retry-After": str(math.ceil(wait))})
+
+async def require_star(github_username: str):
+    """Raise 403 unless the username may use the analysis endpoints"""
     if not github_username:
         raise HTTPException(status_code=403, detail="GitHub username required")
     
@@ -584,107 +524,418 @@ async def check_symptoms(request: dict, github_username: str = None):
     else:
         # Verify star
         try:
-            url = f"https://api.github.com/users/{github_username}/starred/sanatanisher01/Healthcare-symptoms"
-            headers = {"User-Agent": "MediCheck-App/1.0"}
-            if GITHUB_TOKEN:
-                headers["Authorization"] = f"token {GITHUB_TOKEN}"
-            star_response = requests.get(url, headers=headers, timeout=15)
+            status, _ = await star_checker.check(github_username)
             
-            if star_response.status_code != 204:
+            if status != star_verifier.STARRED:
                 raise HTTPException(status_code=403, detail="Please star the repository first")
-        except requests.RequestException:
+        except httpx.HTTPError:
             raise HTTPException(status_code=403, detail="Unable to verify star status")
+
+@app.post("/check-symptoms", response_model=AnalysisResult, operation_id="check_symptoms", responses=GATED_RESPONSES)
+async def check_symptoms(request: SymptomRequest, client: Request, github_username: Optional[str] = github_username_query()):
+    """Analyze symptoms - requires GitHub star verification"""
     
-    # Enhanced dynamic symptom analysis
-    symptoms_lower = request.get("symptoms", "").lower()
-    age_group = request.get("age_group", "")
-    gender = request.get("gender", "")
+    enforce_rate_limits(client, github_username)
+    await require_star(github_username)
     
-    # Use Gemini API for medical analysis
+    return await recorded_analysis("check_symptoms", github_username, *request.analysis_args())
+
+@app.post("/check-symptoms/batch", response_model=BatchResponse, response_model_exclude_none=True,
+          operation_id="check_symptoms_batch", responses={**GATED_RESPONSES, 413: {"model": ErrorResponse}})
+async def check_symptoms_batch(request: BatchRequest, client: Request, github_username: Optional[str] = github_username_query()):
+    """Analyze many symptom records at once; results come back in input order"""
+    items = request.items
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    
+    # Each item counts against the buckets (capped at the burst, so a large batch empties them)
+    enforce_rate_limits(client, github_username, cost=max(1, len(items)))
+    await require_star(github_username)
+    
+    # Validate each item on its own so one bad record does not fail the batch,
+    # and group identical inputs so each is analysed once
+    keys = []
+    invalid = {}
+    unique = {}
+    for index, item in enumerate(items):
+        try:
+            args = SymptomRequest.parse_obj(item).analysis_args()
+        except ValidationError as e:
+            error = e.errors()[0]
+            invalid[index] = f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            keys.append(None)
+            continue
+        key = analysis_key(*args)
+        keys.append(key)
+        unique.setdefault(key, args)
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def run(args):
+        async with semaphore:
+            return await recorded_analysis("batch", github_username, *args)
+    
+    outcomes = await asyncio.gather(*(run(args) for args in unique.values()), return_exceptions=True)
+    by_key = dict(zip(unique.keys(), outcomes))
+    
+    results = []
+    for index, key in enumerate(keys):
+        if key is None:
+            results.append({"index": index, "status": "invalid", "error": invalid[index]})
+        elif isinstance(by_key[key], Exception):
+            results.append({"index": index, "status": "error", "error": "Analysis failed"})
+        else:
+            results.append({"index": index, "status": "ok", "result": by_key[key]})
+    
+    return {"results": results, "unique": len(unique)}
+
+@app.post("/check-symptoms/stream", response_class=StreamingResponse, operation_id="check_symptoms_stream",
+          responses={**GATED_RESPONSES, 200: {"content": {"text/event-stream": {}},
+                                              "description": "diagnosis, recommendation and summary events"}})
+async def check_symptoms_stream(request: SymptomRequest, client: Request, github_username: Optional[str] = github_username_query()):
+    """Stream an analysis as Server-Sent Events while Gemini is still generating"""
+    enforce_rate_limits(client, github_username)
+    await require_star(github_username)
+    
+    started = time.perf_counter()
+    
+    def done(result, tier):
+        if history is not None:
+            history.record("stream", github_username, result["source"], tier, time.perf_counter() - started)
+    
+    return StreamingResponse(
+        stream_analysis(*request.analysis_args(), done=done),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/analyses", status_code=202, response_model=AnalysisJob, response_model_exclude_none=True,
+          operation_id="submit_analysis", responses=GATED_RESPONSES)
+async def submit_analysis(request: AnalysisJobRequest, client: Request, response: Response,
+                          github_username: Optional[str] = github_username_query()):
+    """Queue an analysis and return its job ID at once; poll GET /analyses/{id} for the result"""
+    enforce_rate_limits(client, github_username)
+    await require_star(github_username)
+    
+    try:
+        job = await analysis_jobs.submit((github_username, *request.analysis_args()), request.priority.value)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Analysis queue is full, please retry", headers={"Retry-After": "5"})
+    response.headers["Location"] = f"/analyses/{job['id']}"
+    return job
+
+@app.get("/analyses/{job_id}", response_model=AnalysisJob, response_model_exclude_none=True,
+         operation_id="get_analysis", responses={404: {"model": ErrorResponse}})
+async def get_analysis(job_id: str):
+    """Status of a submitted analysis, with the result once it is done"""
+    job = await analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis not found or expired")
+    return job
+
+@app.get("/api/history", response_model=HistoryPage, response_model_exclude_none=True, operation_id="get_history",
+         responses={400: {"model": ErrorResponse}, 401: {"model": ErrorResponse}, 404: {"model": ErrorResponse}})
+async def get_history(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    github_username: Optional[str] = github_username_query(),
+    user_hash: Optional[str] = Query(None, max_length=64, description="Filter by stored username hash"),
+    since: Optional[float] = Query(None, description="Unix time, inclusive"),
+    until: Optional[float] = Query(None, description="Unix time, exclusive"),
+    limit: int = Query(50, ge=1),
+    cursor: Optional[str] = Query(None, max_length=64, description="next_cursor from the previous page"),
+):
+    """Analyses served, newest first, one keyset-paginated page at a time; needs the HISTORY_API_TOKEN bearer token"""
+    if history is None or HISTORY_API_TOKEN is None:
+        raise HTTPException(status_code=404, detail="History is disabled")
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode(), HISTORY_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing token", headers={"WWW-Authenticate": "Bearer"})
+    if github_username:
+        user_hash = history.hash_username(github_username)
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    items, next_cursor = await asyncio.to_thread(
+        history.query, user_hash, since, until, min(limit, HISTORY_PAGE_MAX), position
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
+def sse_event(event: str, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def replay_analysis(result):
+    """Events for an already complete analysis (cache hit or fallback)"""
+    for diagnosis in result["diagnoses"]:
+        yield sse_event("diagnosis", {"text": diagnosis})
+    for recommendation in result["recommendations"]:
+        yield sse_event("recommendation", {"text": recommendation})
+    yield sse_event("summary", result)
+
+async def stream_analysis(symptoms_lower: str, age_group: str, gender: str, done=None):
+    """Yield diagnosis/recommendation events as Gemini lines arrive, then a summary event
+
+    done(result, tier), if given, is called once the summary is known.
+    """
+    done = done or (lambda result, tier: None)
+    key = analysis_key(symptoms_lower, age_group, gender)
+    cached = await analysis_cache.aget(key)
+    tier = "cache"
+    if cached is not None:
+        analyses_total.inc("cache")
+    else:
+        cached = offline_first_analysis(symptoms_lower, age_group, gender)
+        tier = "offline"
+    if cached is not None:
+        done(cached, tier)
+        for event in replay_analysis(cached):
+            yield event
+        return
+    
+    reason = "no_api_key"
     if GEMINI_API_KEY:
+        parser = SectionParser()
+        limits = {response_parser.DIAGNOSES: response_parser.MAX_DIAGNOSES,
+                  response_parser.RECOMMENDATIONS: response_parser.MAX_RECOMMENDATIONS}
+        emitted = dict.fromkeys(limits, 0)
+        
+        def parse_line(line):
+            item = parser.feed(line)
+            if item is None:
+                return None
+            section, text = item
+            if emitted[section] >= limits[section]:
+                return None
+            emitted[section] += 1
+            return sse_event("diagnosis" if section == response_parser.DIAGNOSES else "recommendation", {"text": text})
+        
+        admitted = False
         try:
-            print(f"🤖 Using Gemini API for: {symptoms_lower}")
-            
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
-            
-            headers = {"Content-Type": "application/json"}
-            
-            payload = {
-                "contents": [{
-                    "parts": [{
-                        "text": f"Medical Analysis Request:\nPatient: {age_group} {gender}\nSymptoms: {symptoms_lower}\n\nPlease provide:\n1. Possible Diagnoses (2-3 conditions)\n2. Recommendations (3-4 actionable steps)\n\nFormat your response clearly with sections."
-                    }]
-                }],
-                "generationConfig": {
-                    "temperature": 0.3,
-                    "maxOutputTokens": 300
-                }
-            }
-            
-            print(f"📤 Sending request to Gemini...")
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code != 200:
-                print(f"❌ Gemini API Error Response: {response.text[:200]}")
-            
-            print(f"🔍 Gemini API Status: {response.status_code}")
+            gemini_breaker.acquire()
+            admitted = True
+            url = f"/v1beta/models/gemini-1.5-flash:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
+            payload = analysis_payload(symptoms_lower, age_group, gender, structured=False)
+            usage = {}
+            last = {}
+            pending = ""
+            async with upstream.gemini.stream("POST", url, json=payload) as response:
+                if response.status_code != 200:
+                    raise Exception(f"Gemini API error: {response.status_code}")
+                async for chunk in response.aiter_lines():
+                    if not chunk.startswith("data:"):
+                        continue
+                    data = last = json.loads(chunk[5:])
+                    if "usageMetadata" in data:
+                        usage = data
+                    pending += data['candidates'][0]['content']['parts'][0].get('text', '')
+                    # Only complete lines can be classified
+                    *lines, pending = pending.split('\n')
+                    for line in lines:
+                        event = parse_line(line)
+                        if event:
+                            yield event
+            event = parse_line(pending)
+            if event:
+                yield event
             
-            if response.status_code == 200:
-                result = response.json()
-                ai_response = result['candidates'][0]['content']['parts'][0]['text']
-                
-                print(f"✅ Gemini Success: {ai_response[:100]}...")
-                
-                # Parse response
-                diagnoses = []
-                recommendations = []
-                
-                lines = ai_response.split('\n')
-                current_section = None
-                
-                for line in lines:
-                    line = line.strip().replace('-', '').replace('*', '').replace('•', '').replace('1.', '').replace('2.', '').replace('3.', '').replace('4.', '')
-                    if any(word in line.lower() for word in ['diagnos', 'possible', 'condition']):
-                        current_section = 'diagnoses'
-                    elif any(word in line.lower() for word in ['recommend', 'advice', 'suggest', 'step']):
-                        current_section = 'recommendations'
-                    elif line and len(line) > 15:
-                        if current_section == 'diagnoses':
-                            diagnoses.append(line)
-                        elif current_section == 'recommendations':
-                            recommendations.append(line)
-                        elif any(word in line.lower() for word in ['consult', 'see', 'visit', 'call', 'seek', 'rest', 'monitor']):
-                            recommendations.append(line)
-                        else:
-                            diagnoses.append(line)
-                
-                # Ensure content
-                if not diagnoses:
-                    diagnoses = ["Respiratory condition", "Viral infection", "General health concern"]
-                if not recommendations:
-                    recommendations = [
-                        "Consult a healthcare professional for proper evaluation",
-                        "Monitor symptoms and seek care if they worsen",
-                        "Rest and stay hydrated",
-                        "Call emergency services if experiencing severe symptoms"
-                    ]
-                
-                return {
-                    "diagnoses": diagnoses[:3],
-                    "recommendations": recommendations[:4],
-                    "source": "Google Gemini AI"
-                }
+            # A stream's length depends on the reply, so it counts for health but not for latency
+            gemini_breaker.record(True)
+            analyses_total.inc("gemini")
+            record_gemini_usage("stream", usage, payload["generationConfig"]["maxOutputTokens"])
             
-            else:
-                error_text = response.text if response.text else "Unknown error"
-                print(f"❌ Gemini API failed: {response.status_code} - {error_text[:200]}")
-                raise Exception(f"Gemini API error: {response.status_code}")
-                
+            result = parser.result()
+            # A reply cut off at maxOutputTokens is served but not cached
+            if not truncated(last):
+                await analysis_cache.aset(key, result)
+            done(result, "gemini")
+            yield sse_event("summary", result)
+            return
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client went away mid-stream
+            if admitted:
+                gemini_breaker.release()
+            raise
+        except Exception as e:
+            if admitted:
+                gemini_breaker.record(False)
+            log.warning("gemini_stream_failed", error=str(e))
+            reason = "circuit_open" if isinstance(e, CircuitOpenError) else "gemini_error"
+            if parser.diagnoses or parser.recommendations:
+                # Items were already sent; close out with what we have rather than mixing in the fallback
+                analyses_total.inc("gemini_partial")
+                result = parser.result()
+                done(result, "gemini_partial")
+                yield sse_event("summary", result)
+                return
+    
+    result = fallback_analysis(symptoms_lower, age_group, gender, reason)
+    done(result, "fallback")
+    for event in replay_analysis(result):
+        yield event
+
+async def recorded_analysis(endpoint: str, github_username: Optional[str], symptoms_lower: str, age_group: str, gender: str):
+    """Run the analysis pipeline and add the outcome to the analysis history"""
+    started = time.perf_counter()
+    result, tier = await tiered_analysis(symptoms_lower, age_group, gender)
+    if history is not None:
+        history.record(endpoint, github_username, result["source"], tier, time.perf_counter() - started)
+    return result
+
+async def tiered_analysis(symptoms_lower: str, age_group: str, gender: str):
+    """Cached analysis pipeline: cache, then Gemini, then the fallback system; returns (result, answering tier)"""
+    key = analysis_key(symptoms_lower, age_group, gender)
+    cached = await analysis_cache.aget(key)
+    if cached is not None:
+        analyses_total.inc("cache")
+        return cached, "cache"
+    
+    local = offline_first_analysis(symptoms_lower, age_group, gender)
+    if local is not None:
+        return local, "offline"
+    
+    # Use Gemini API for medical analysis
+    if GEMINI_API_KEY:
+        try:
+            result = await analysis_flights.do(key, cached_gemini_analysis, key, symptoms_lower, age_group, gender)
+            analyses_total.inc("gemini")
+            return result, "gemini"
         except Exception as e:
-            print(f"❌ Gemini API error: {str(e)}")
+            log.warning("gemini_failed", error=str(e))
+            reason = ("circuit_open" if isinstance(e, CircuitOpenError)
+                      else "unparseable" if isinstance(e, AnalysisParseError) else "gemini_error")
+            return fallback_analysis(symptoms_lower, age_group, gender, reason), "fallback"
+    
+    return fallback_analysis(symptoms_lower, age_group, gender, "no_api_key"), "fallback"
+
+async def cached_gemini_analysis(key: str, symptoms_lower: str, age_group: str, gender: str):
+    """Run one Gemini analysis and store it; shared by every coalesced caller"""
+    if gemini_batcher is not None:
+        result = await gemini_batcher.submit((symptoms_lower, age_group, gender))
+    else:
+        result = await gemini_breaker.call(gemini_analysis, symptoms_lower, age_group, gender)
+    # Salvaged or cut-off replies are served this once but would otherwise stick for the whole TTL
+    if not isinstance(result, PartialAnalysis):
+        await analysis_cache.aset(key, result)
+    return result
+
+async def refresh_analysis(symptoms_lower: str, age_group: str, gender: str):
+    """Recompute an analysis with Gemini and store it whatever the cache holds; used by the cache warmer"""
+    key = analysis_key(symptoms_lower, age_group, gender)
+    return await analysis_flights.do(key, cached_gemini_analysis, key, symptoms_lower, age_group, gender)
+
+def analysis_payload(symptoms_lower: str, age_group: str, gender: str, structured: bool = True):
+    """Gemini request body for a single-patient analysis: JSON output, or line sections for streaming"""
+    terms = compact_terms(symptoms_lower)
+    config = {
+        "temperature": 0.3,
+        "maxOutputTokens": output_budget(terms, GEMINI_MAX_OUTPUT_TOKENS)
+    }
+    if structured:
+        config["responseMimeType"] = "application/json"
+    return {
+        "contents": [{
+            "parts": [{
+                "text": f"Medical analysis. {patient_line(terms, age_group, gender)}\n{JSON_INSTRUCTION if structured else SECTIONS_INSTRUCTION}"
+            }]
+        }],
+        "generationConfig": config
+    }
+
+async def gemini_analysis(symptoms_lower: str, age_group: str, gender: str):
+    """Ask Gemini for an analysis; raises on any upstream failure"""
+    log.debug("gemini_request", symptoms=symptoms_lower, age_group=age_group, gender=gender)
+    
+    url = f"/v1beta/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
+    payload = analysis_payload(symptoms_lower, age_group, gender)
+    
+    response = await upstream.gemini.post(url, json=payload)
+    
+    if response.status_code != 200:
+        log.warning("gemini_response", status=response.status_code)
+        log.body("gemini_error_body", response.text or "Unknown error", status=response.status_code)
+        raise Exception(f"Gemini API error: {response.status_code}")
+    
+    result = response.json()
+    ai_response = result['candidates'][0]['content']['parts'][0]['text']
+    
+    log.debug("gemini_response", status=response.status_code, chars=len(ai_response))
+    log.body("gemini_body", ai_response)
+    record_gemini_usage("single", result, payload["generationConfig"]["maxOutputTokens"])
     
-    # Fallback system
-    print("🔄 Using fallback system")
+    analysis = parse_json_analysis(ai_response)
+    return PartialAnalysis(analysis) if truncated(result) else analysis
+
+PATIENT_HEADER = re.compile(r"^\s*#*\s*\**\s*patient\s+(\d+)\b.*$", re.IGNORECASE | re.MULTILINE)
+
+async def gemini_batch_analysis(items):
+    """Analyse several patients with one Gemini call; raises BatchParseError if the reply cannot be split"""
+    log.debug("gemini_batch_request", items=len(items))
+    
+    url = f"/v1beta/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
+    
+    terms = [compact_terms(symptoms_lower) for symptoms_lower, _, _ in items]
+    patients = "\n".join(
+        f"{number}. {patient_line(item_terms, age_group, gender)}"
+        for number, (item_terms, (_, age_group, gender)) in enumerate(zip(terms, items), start=1)
+    )
+    budget = sum(output_budget(item_terms, GEMINI_MAX_OUTPUT_TOKENS) for item_terms in terms)
+    payload = {
+        "contents": [{
+            "parts": [{
+                "text": f"Medical analysis of {len(items)} independent patients:\n{patients}\n\nFor each patient in order, start with the line '### Patient N' (N is the patient number), then: {SECTIONS_INSTRUCTION}. Nothing else."
+            }]
+        }],
+        "generationConfig": {
+            "temperature": 0.3,
+            "maxOutputTokens": budget
+        }
+    }
+    
+    response = await upstream.gemini.post(url, json=payload)
+    log.debug("gemini_batch_response", status=response.status_code, items=len(items))
+    
+    if response.status_code != 200:
+        raise Exception(f"Gemini API error: {response.status_code}")
+    
+    try:
+        result = response.json()
+        ai_response = result['candidates'][0]['content']['parts'][0]['text']
+    except (KeyError, IndexError, ValueError) as e:
+        raise BatchParseError(f"unexpected batch payload: {str(e)}")
+    record_gemini_usage("batch", result, budget)
+    
+    # Sections are delimited by '### Patient N' headers, which must cover 1..N exactly
+    headers = list(PATIENT_HEADER.finditer(ai_response))
+    if [int(match.group(1)) for match in headers] != list(range(1, len(items) + 1)):
+        raise BatchParseError("patient sections missing or out of order")
+    
+    bounds = [match.end() for match in headers]
+    starts = [match.start() for match in headers[1:]] + [len(ai_response)]
+    analyses = [parse_analysis(ai_response[begin:end]) for begin, end in zip(bounds, starts)]
+    if truncated(result):
+        # Only the last patient is cut short, but the reply as a whole is not worth caching
+        analyses = [PartialAnalysis(analysis) for analysis in analyses]
+    return analyses
+
+def offline_first_analysis(symptoms_lower: str, age_group: str, gender: str):
+    """Offline engine answer when it is confident enough to skip Gemini, else None"""
+    if OFFLINE_FIRST_CONFIDENCE <= 0:
+        return None
+    result, confidence = get_symptom_engine().analyze(symptoms_lower, age_group, gender)
+    if confidence < OFFLINE_FIRST_CONFIDENCE:
+        return None
+    analyses_total.inc("offline")
+    return result
+
+def fallback_analysis(symptoms_lower: str, age_group: str, gender: str, reason: str = "gemini_error"):
+    """Offline engine answer used when Gemini is unavailable"""
+    log.info("fallback", reason=reason)
+    analyses_total.inc("fallback")
+    result, _ = get_symptom_engine().analyze(symptoms_lower, age_group, gender)
+    if result is not None:
+        fallbacks_total.inc(reason, "engine")
+        return result
+    fallbacks_total.inc(reason, "static")
+    # Nothing in the knowledge table matched
     return {
         "diagnoses": ["Common viral infection", "Respiratory condition", "Stress-related symptoms"],
         "recommendations": [
@@ -695,6 +946,9 @@ async def check_symptoms(request: dict, github_username: str = None):
         ],
         "source": "Enhanced AI Medical System"
     }
+
+cold_start.mark("imported")
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
@@ -0,0 +1,82 @@
+import asyncio
+
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+
+class BatchParseError(Exception):
+    """The combined upstream reply could not be split back into one answer per item"""
+
+
+class MicroBatcher:
+    """Collect submissions for a short window and run them as one batch call
+
+    A batch is flushed after `window` seconds or as soon as `max_items` are
+    waiting, so added latency is bounded by the window. If run_batch raises
+    BatchParseError every item is retried through run_one; any other error is
+    delivered to all waiters of that batch.
+    """
+
+    def __init__(self, run_batch, run_one, window=0.02, max_items=16):
+        self.run_batch = run_batch
+        self.run_one = run_one
+        self.window = window
+        self.max_items = max_items
+        self.batches = 0
+        self.batched_items = 0
+        self.fallbacks = 0
+        self._pending = []
+        self._timer = None
+        # The loop only holds tasks weakly; a collected batch task would leave its waiters hanging
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            if len(items) == 1:
+                outcomes = [await self.run_one(items[0])]
+            else:
+                outcomes = await self.run_batch(items)
+                if len(outcomes) != len(items):
+                    raise BatchParseError(f"expected {len(items)} answers, got {len(outcomes)}")
+                self.batches += 1
+                self.batched_items += len(items)
+        except BatchParseError as e:
+            log.warning("microbatch_split_failed", items=len(items), error=str(e))
+            self.fallbacks += 1
+            outcomes = await asyncio.gather(*(self.run_one(item) for item in items), return_exceptions=True)
+        except Exception as e:
+            outcomes = [e] * len(items)
+
+        for future, outcome in zip(futures, outcomes):
+            if future.done():
+                continue
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    def stats(self):
+        return {"batches": self.batches, "batched_items": self.batched_items, "fallbacks": self.fallbacks}
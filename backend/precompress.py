@@ -0,0 +1,44 @@
+"""Write .gz and .br siblings for compressible files in a frontend build
+
+Usage: python precompress.py ../frontend/dist
+"""
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = {".html", ".js", ".mjs", ".css", ".svg", ".json", ".map", ".txt", ".xml", ".webmanifest", ".ico"}
+MIN_SIZE = 1024
+
+
+def precompress(root):
+    written = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+                continue
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                body = f.read()
+            if len(body) < MIN_SIZE:
+                continue
+            variants = [(".gz", gzip.compress(body, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append((".br", brotli.compress(body, quality=11)))
+            for suffix, compressed in variants:
+                # Only keep variants that actually save bytes
+                if len(compressed) < len(body):
+                    with open(path + suffix, "wb") as f:
+                        f.write(compressed)
+                    written += 1
+    return written
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    print(f"🗜️ Wrote {precompress(sys.argv[1])} precompressed files")
@@ -0,0 +1,77 @@
+import gzip
+import hashlib
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Preferred order when the client accepts several encodings equally
+ENCODINGS = ("br", "gzip")
+
+
+def accepted_encodings(accept_encoding: str):
+    """Content codings the client accepts (q > 0), lowercased"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding and q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def etag_matches(if_none_match: str, etags):
+    """True if an If-None-Match header matches any of our ETags (weak comparison)"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return not candidates.isdisjoint(etags)
+
+
+class PrecompressedAsset:
+    """An in-memory response body with its gzip/brotli variants and ETags computed once"""
+
+    def __init__(self, body: bytes, media_type: str, cache_control="no-cache"):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        # Each representation gets its own strong ETag
+        self.variants = {None: (body, f'"{digest}"')}
+        self.variants["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"')
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+        self.etags = {etag for _, etag in self.variants.values()}
+
+    @classmethod
+    def from_file(cls, path, media_type, **kwargs):
+        with open(path, "rb") as f:
+            return cls(f.read(), media_type, **kwargs)
+
+    def select(self, accept_encoding: str):
+        """Best available encoding for an Accept-Encoding header (None = identity)"""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.variants and (encoding in accepted or "*" in accepted):
+                return encoding
+        return None
+
+    def response(self, request):
+        encoding = self.select(request.headers.get("accept-encoding", ""))
+        body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+
+        if etag_matches(request.headers.get("if-none-match", ""), self.etags):
+            return Response(status_code=304, headers=headers)
+
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
@@ -0,0 +1,79 @@
+from analysis_cache import symptom_terms
+from response_parser import MAX_DIAGNOSES, MAX_RECOMMENDATIONS
+
+MAX_TERMS = 12
+MAX_TERM_CHARS = 80
+
+# Output budget: a base for the fixed structure plus a share per symptom term, capped
+BASE_OUTPUT_TOKENS = 160
+OUTPUT_TOKENS_PER_TERM = 12
+MAX_OUTPUT_TOKENS = 300
+
+JSON_INSTRUCTION = (
+    f'Reply with JSON only: {{"diagnoses": [2-{MAX_DIAGNOSES} likely conditions], '
+    f'"recommendations": [3-{MAX_RECOMMENDATIONS} short actionable steps]}}'
+)
+SECTIONS_INSTRUCTION = (
+    f"Reply with a 'Diagnoses:' section (2-{MAX_DIAGNOSES} likely conditions) and a "
+    f"'Recommendations:' section (3-{MAX_RECOMMENDATIONS} short actionable steps), one item per line"
+)
+
+
+def compact_terms(symptoms: str, max_terms=MAX_TERMS):
+    """De-duplicated symptom phrases, at most max_terms of them, each cut to MAX_TERM_CHARS at a word boundary"""
+    terms = []
+    for term in symptom_terms(symptoms)[:max_terms]:
+        if len(term) > MAX_TERM_CHARS:
+            term = term[:MAX_TERM_CHARS].rsplit(" ", 1)[0]
+        terms.append(term)
+    # Nothing but separators: pass the text on as one term rather than an empty list
+    return terms or [symptoms.strip()[:MAX_TERM_CHARS]]
+
+
+def output_budget(terms, cap=MAX_OUTPUT_TOKENS):
+    """maxOutputTokens for an analysis of `terms`: more symptoms leave more to explain"""
+    return min(cap, BASE_OUTPUT_TOKENS + OUTPUT_TOKENS_PER_TERM * len(terms))
+
+
+def patient_line(terms, age_group: str, gender: str):
+    patient = " ".join(part for part in (age_group, gender) if part)
+    return f"Patient: {patient or 'unspecified'}; Symptoms: {'; '.join(terms)}"
+
+
+def truncated(response):
+    """Whether a Gemini response (or the last chunk of a stream) stopped at maxOutputTokens"""
+    candidates = response.get("candidates") or [{}]
+    return candidates[0].get("finishReason") == "MAX_TOKENS"
+
+
+class TokenUsage:
+    """Running Gemini token totals by call kind, from each response's usageMetadata"""
+
+    def __init__(self):
+        self.calls = {}
+        self.prompt_tokens = {}
+        self.output_tokens = {}
+        self.truncated = {}
+
+    def record(self, kind, response):
+        """Add one response's usage; returns (prompt_tokens, output_tokens)"""
+        usage = response.get("usageMetadata") or {}
+        prompt = usage.get("promptTokenCount", 0)
+        output = usage.get("candidatesTokenCount", 0)
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        self.prompt_tokens[kind] = self.prompt_tokens.get(kind, 0) + prompt
+        self.output_tokens[kind] = self.output_tokens.get(kind, 0) + output
+        if truncated(response):
+            self.truncated[kind] = self.truncated.get(kind, 0) + 1
+        return prompt, output
+
+    def stats(self):
+        return {
+            kind: {
+                "calls": calls,
+                "prompt_tokens": self.prompt_tokens[kind],
+                "output_tokens": self.output_tokens[kind],
+                "truncated": self.truncated.get(kind, 0),
+            }
+            for kind, calls in self.calls.items()
+        }
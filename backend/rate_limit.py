@@ -0,0 +1,114 @@
+import math
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets with bounded memory
+
+    Each key may spend up to `burst` tokens at once and regains `rate` tokens
+    per second. Buckets are kept in least-recently-used order: those idle for
+    `idle_seconds` are evicted (with idle_seconds >= burst / rate they have
+    refilled by then, so dropping them changes nothing), as is the least
+    recently used bucket once there are more than `max_keys`.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000, idle_seconds=600):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        self.limited = 0
+        self._buckets = OrderedDict()
+
+    def take(self, key, cost=1):
+        """Spend `cost` tokens; returns 0.0 if allowed, else seconds until it would be"""
+        now = time.monotonic()
+        cost = min(cost, self.burst)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            self._evict(now)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        self.limited += 1
+        return (cost - bucket[0]) / self.rate
+
+    def _evict(self, now):
+        buckets = self._buckets
+        # Oldest first, so stop at the first bucket that is still active and within the cap
+        while buckets:
+            _, updated = next(iter(buckets.values()))
+            if len(buckets) <= self.max_keys and now - updated < self.idle_seconds:
+                break
+            buckets.popitem(last=False)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def stats(self):
+        return {"keys": len(self._buckets), "limited": self.limited}
+
+
+class ConcurrencyLimiter:
+    """Global cap on requests being served at once; excess is refused, never queued"""
+
+    def __init__(self, max_in_flight, retry_after=1):
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.shed = 0
+
+    def try_acquire(self):
+        if self.in_flight >= self.max_in_flight:
+            self.shed += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "max_in_flight": self.max_in_flight, "shed": self.shed}
+
+
+class LoadShedMiddleware:
+    """Pure ASGI middleware answering 503 + Retry-After at once when the concurrency limit is hit
+
+    Paths in `exempt` (health checks, metrics) are always admitted.
+    """
+
+    def __init__(self, app, limiter, exempt=()):
+        self.app = app
+        self.limiter = limiter
+        self.exempt = frozenset(exempt)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        if not self.limiter.try_acquire():
+            body = b'{"detail":"Server is busy, please retry"}'
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(self.limiter.retry_after)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
@@ -0,0 +1,174 @@
+import json
+import re
+
+DIAGNOSES = "diagnoses"
+RECOMMENDATIONS = "recommendations"
+
+# classify_line kinds
+HEADER = "header"
+ITEM = "item"
+SKIP = "skip"
+
+MAX_DIAGNOSES = 3
+MAX_RECOMMENDATIONS = 4
+MIN_ITEM_LENGTH = 3
+
+DEFAULT_DIAGNOSES = ["Respiratory condition", "Viral infection", "General health concern"]
+DEFAULT_RECOMMENDATIONS = [
+    "Consult a healthcare professional for proper evaluation",
+    "Monitor symptoms and seek care if they worsen",
+    "Rest and stay hydrated",
+    "Call emergency services if experiencing severe symptoms"
+]
+
+# Leading list markers only: bullets and "1." / "2)" need trailing space, so "1.5 mg" and "-5" survive
+_MARKERS = re.compile(r"^\s*(?:(?:[-*•+]|\d{1,2}[.)])\s+|#{1,6}\s*)*")
+_EMPHASIS = ("**", "__", "`")
+# A section word only starts a header when followed by a colon (after at most a short label with no
+# verb-like words) or by nothing but a parenthetical, so "Causes of fatigue include anemia" stays content
+_HEADER = re.compile(
+    r"^(?:(?:possible|potential|differential|likely|recommended|suggested)\s+)?"
+    r"(?:(?P<diagnoses>diagnos[ie]s|conditions?|causes?)"
+    r"|(?P<recommendations>recommendations?|advice|suggestions?|(?:next\s+)?steps?|what\s+to\s+do))\b"
+    r"(?:(?![^:]*\b(?:is|are|was|were|can|could|may|might|should|will|would|includes?|helps?)\b)"
+    r"[^:.]{0,40}:\s*(?P<rest>.*)|\s*(?:\([^()]*\))?)$",
+    re.IGNORECASE,
+)
+# Applied to lowercased text; IGNORECASE alternations are several times slower
+_RECOMMENDATION_WORDS = re.compile(r"\b(?:c(?:onsult|all)|s(?:ee|eek)|visit|rest|monitor)\b")
+_SKIP_PREFIX = re.compile(r"(?:disclaimer|note)\b", re.IGNORECASE)
+
+
+def clean_line(line: str):
+    """Strip list markers and markdown emphasis without touching the content itself"""
+    for marker in _EMPHASIS:
+        if marker in line:
+            line = line.replace(marker, "")
+    return line[_MARKERS.match(line).end():].strip()
+
+
+def classify_line(line: str, section=None):
+    """Classify one line in a single pass
+
+    Returns (HEADER, section, rest) for section headers, where rest is any
+    inline content after the colon; (ITEM, section, text) for content; and
+    (SKIP, None, None) for everything else. Content outside any section is
+    assigned RECOMMENDATIONS if it reads like an action, else DIAGNOSES.
+    """
+    if not line or line.isspace():
+        return SKIP, None, None
+    text = clean_line(line)
+    if len(text) < MIN_ITEM_LENGTH:
+        return SKIP, None, None
+    match = _HEADER.match(text)
+    if match:
+        section = DIAGNOSES if match.group(DIAGNOSES) else RECOMMENDATIONS
+        rest = (match.group("rest") or "").strip()
+        return HEADER, section, rest if len(rest) >= MIN_ITEM_LENGTH else None
+    # Unrecognised headings and "Label:" lines are structure, not content
+    if text.endswith(":") or line.lstrip().startswith("#") or _SKIP_PREFIX.match(text):
+        return SKIP, None, None
+    if section is None:
+        section = RECOMMENDATIONS if _RECOMMENDATION_WORDS.search(text.lower()) else DIAGNOSES
+    return ITEM, section, text
+
+
+class SectionParser:
+    """Incremental line-by-line parser for Gemini analysis text"""
+
+    def __init__(self):
+        self.diagnoses = []
+        self.recommendations = []
+        self.current_section = None
+
+    def feed(self, line: str):
+        """Consume one line; returns (section, text) when it yields an item, else None"""
+        kind, section, text = classify_line(line, self.current_section)
+        if kind == HEADER:
+            self.current_section = section
+        if text is None:
+            return None
+        items = self.diagnoses if section == DIAGNOSES else self.recommendations
+        items.append(text)
+        return section, text
+
+    def result(self, source="Google Gemini AI"):
+        """Final response shape, padded with defaults and truncated like /check-symptoms"""
+        return {
+            "diagnoses": (self.diagnoses or DEFAULT_DIAGNOSES)[:MAX_DIAGNOSES],
+            "recommendations": (self.recommendations or DEFAULT_RECOMMENDATIONS)[:MAX_RECOMMENDATIONS],
+            "source": source
+        }
+
+
+def parse_analysis(ai_response: str):
+    """Split a Gemini answer into diagnoses and recommendations"""
+    parser = SectionParser()
+    for line in ai_response.splitlines():
+        parser.feed(line)
+    return parser.result()
+
+
+class PartialAnalysis(dict):
+    """An analysis read from a reply that was cut off or malformed: fine to serve once, not to cache"""
+
+
+class AnalysisParseError(ValueError):
+    """A Gemini reply with nothing that can be read as an analysis"""
+
+
+# Complete string items of a "diagnoses"/"recommendations" array, even when the reply is cut off
+_JSON_SECTION = re.compile(r'"(diagnoses|recommendations)"\s*:\s*\[([^\]]*)')
+_JSON_STRING = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+
+def _json_string(raw):
+    try:
+        return json.loads(f'"{raw}"')
+    except ValueError:
+        return None
+
+
+def salvage_json_sections(text: str):
+    """Items from whatever complete strings a truncated or malformed JSON analysis holds"""
+    sections = {}
+    for match in _JSON_SECTION.finditer(text):
+        sections[match.group(1)] = [_json_string(raw) for raw in _JSON_STRING.findall(match.group(2))]
+    return sections
+
+
+def parse_json_analysis(ai_response: str):
+    """Read a JSON-mode Gemini answer
+
+    Answers that are not JSON at all (the model ignored the instruction) go
+    through parse_analysis. JSON that does not parse, typically a reply cut
+    off by maxOutputTokens, keeps every complete item and comes back as a
+    PartialAnalysis; AnalysisParseError is raised only when not one
+    diagnosis or recommendation survives.
+    """
+    text = ai_response.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    if not text.startswith("{"):
+        return parse_analysis(ai_response)
+    analysis = dict
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = salvage_json_sections(text)
+        analysis = PartialAnalysis
+    if not isinstance(data, dict):
+        raise AnalysisParseError("analysis JSON is not an object")
+    sections = {}
+    for section in (DIAGNOSES, RECOMMENDATIONS):
+        items = data.get(section)
+        if not isinstance(items, list):
+            items = []
+        sections[section] = [clean_line(item) for item in items if isinstance(item, str) and len(item.strip()) >= MIN_ITEM_LENGTH]
+    if not sections[DIAGNOSES] and not sections[RECOMMENDATIONS]:
+        raise AnalysisParseError("no analysis items in the reply")
+    return analysis(
+        diagnoses=(sections[DIAGNOSES] or DEFAULT_DIAGNOSES)[:MAX_DIAGNOSES],
+        recommendations=(sections[RECOMMENDATIONS] or DEFAULT_RECOMMENDATIONS)[:MAX_RECOMMENDATIONS],
+        source="Google Gemini AI",
+    )
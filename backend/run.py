@@ -1,12 +1,29 @@
 import uvicorn
 import os
+import runpy
 import sys
 
+def run_production(port):
+    """Multi-worker mode: gunicorn with uvicorn workers, sized by gunicorn.conf.py"""
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py")
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        # e.g. Windows: uvicorn's own supervisor runs the workers, without graceful reload
+        workers = runpy.run_path(config)["workers"]
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
+        return
+    # Replace this process so signals (HUP to reload, TERM to stop) reach the gunicorn master
+    os.execv(sys.executable, [sys.executable, "-m", "gunicorn", "-c", config, "main:app"])
+
 if __name__ == "__main__":
     # Ensure we're using the virtual environment
     venv_python = "/opt/render/project/src/backend/venv/bin/python"
     if os.path.exists(venv_python) and sys.executable != venv_python:
         os.execv(venv_python, [venv_python] + sys.argv)
-    
+
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=False)
\ No newline at end of file
+    if "--production" in sys.argv[1:]:
+        run_production(port)
+    else:
+        uvicorn.run("main:app", host="0.0.0.0", port=port, reload=False)
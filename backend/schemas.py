@@ -0,0 +1,139 @@
+"""Request and response models for the public API"""
+from enum import Enum
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, Field, constr, validator
+
+SYMPTOMS_MAX_LENGTH = 2000
+# GitHub logins: 1-39 alphanumerics or hyphens, not starting with a hyphen
+GITHUB_USERNAME_PATTERN = r"^[A-Za-z0-9][A-Za-z0-9-]{0,38}$"
+GITHUB_USERNAME_MAX_LENGTH = 39
+
+
+class AgeGroup(str, Enum):
+    child = "Child"
+    teen = "Teen"
+    adult = "Adult"
+    senior = "Senior"
+
+
+class Gender(str, Enum):
+    male = "Male"
+    female = "Female"
+    other = "Other"
+
+
+class SymptomRequest(BaseModel):
+    symptoms: constr(strip_whitespace=True, min_length=1, max_length=SYMPTOMS_MAX_LENGTH) = Field(
+        ..., description="Free-text description of the symptoms", example="fever, sore throat and headache"
+    )
+    age_group: Optional[AgeGroup] = Field(None, description="Case-insensitive; empty means unspecified")
+    gender: Optional[Gender] = Field(None, description="Case-insensitive; empty means unspecified")
+
+    @validator("age_group", "gender", pre=True)
+    def blank_or_title_case(cls, value):
+        if isinstance(value, str):
+            value = value.strip()
+            return value.title() if value else None
+        return value
+
+    def analysis_args(self):
+        """(symptoms_lower, age_group, gender) strings as the analysis pipeline takes them"""
+        return (
+            self.symptoms.lower(),
+            self.age_group.value if self.age_group else "",
+            self.gender.value if self.gender else "",
+        )
+
+
+class BatchRequest(BaseModel):
+    items: List[Any] = Field(..., description="Symptom records shaped like SymptomRequest; invalid ones are reported per item")
+
+    class Config:
+        @staticmethod
+        def schema_extra(schema, model):
+            # Typed loosely so each record is validated on its own, but published as SymptomRequest for clients
+            schema["properties"]["items"]["items"] = {"$ref": "#/components/schemas/SymptomRequest"}
+
+
+class VerifyStarRequest(BaseModel):
+    github_username: constr(
+        strip_whitespace=True, min_length=1, max_length=GITHUB_USERNAME_MAX_LENGTH, regex=GITHUB_USERNAME_PATTERN
+    )
+
+
+class VerifyStarResponse(BaseModel):
+    starred: bool
+    message: str
+
+
+class AnalysisResult(BaseModel):
+    diagnoses: List[str]
+    recommendations: List[str]
+    source: str
+
+
+class BatchItemStatus(str, Enum):
+    ok = "ok"
+    invalid = "invalid"
+    error = "error"
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: BatchItemStatus
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+    unique: int = Field(..., description="Distinct inputs actually analysed")
+
+
+class ErrorResponse(BaseModel):
+    detail: str
+
+
+class JobPriority(str, Enum):
+    high = "high"
+    normal = "normal"
+    low = "low"
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class AnalysisJobRequest(SymptomRequest):
+    priority: JobPriority = JobPriority.normal
+
+
+class AnalysisJob(BaseModel):
+    id: str
+    status: JobStatus
+    priority: JobPriority
+    submitted_at: float = Field(..., description="Unix time")
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+
+
+class HistoryEntry(BaseModel):
+    id: int
+    ts: float = Field(..., description="Unix time the analysis was served")
+    user_hash: Optional[str] = Field(None, description="Keyed hash of the GitHub username")
+    endpoint: str
+    source: str
+    tier: str = Field(..., description="cache, offline, gemini, gemini_partial or fallback")
+    cache_hit: bool
+    latency_ms: float
+
+
+class HistoryPage(BaseModel):
+    items: List[HistoryEntry]
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor for the next (older) page; absent on the last")
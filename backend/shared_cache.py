@@ -0,0 +1,173 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+from cache import TTLCache
+
+
+def connect(path):
+    """SQLite connection safe to share a database file between worker processes
+
+    WAL lets readers proceed while one process writes; the busy timeout makes
+    concurrent writers wait for the lock instead of failing immediately.
+    """
+    db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+class SharedTTLCache:
+    """TTLCache-compatible cache backed by a SQLite table that every worker process shares
+
+    A small per-process TTLCache sits in front, holding entries for at most
+    `local_ttl` seconds so other workers' invalidations are seen quickly.
+    Expired rows are kept for `keep_stale` seconds so get_stale can still
+    serve them when the origin is unavailable.
+
+    SQLite calls may wait up to the busy timeout for another worker's write
+    lock, so async code should use aget/aget_stale/aset/ainvalidate: they
+    answer from the local tier directly and run anything touching SQLite in
+    a thread.
+    """
+
+    def __init__(self, path, table, maxsize=1024, ttl=300, local_ttl=5.0, max_rows=100000, keep_stale=86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_rows = max_rows
+        self.keep_stale = keep_stale
+        self.local = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._table = table
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = connect(path)
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at)")
+
+    def _row(self, key):
+        if self._db is None:
+            return None
+        with self._lock:
+            return self._db.execute(f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)).fetchone()
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        return self._promote(key, self._row(key), default)
+
+    async def aget(self, key, default=None):
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        # Only the SQLite read runs in the thread; the local tier and counters belong to the loop
+        return self._promote(key, await asyncio.to_thread(self._row, key), default)
+
+    def _promote(self, key, row, default):
+        if row is not None and row[1] > time.time():
+            value = json.loads(row[0])
+            self.local.set(key, value, ttl=min(self.local_ttl, row[1] - time.time()))
+            self.hits += 1
+            self.shared_hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def get_stale(self, key, default=None):
+        """Return the value even if it has expired, for use when the origin is unavailable"""
+        value = self.local.get_stale(key)
+        if value is not None:
+            return value
+        row = self._row(key)
+        return default if row is None else json.loads(row[0])
+
+    async def aget_stale(self, key, default=None):
+        value = self.local.get_stale(key)
+        if value is not None:
+            return value
+        row = await asyncio.to_thread(self._row, key)
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.local.set(key, value, ttl=min(self.local_ttl, ttl))
+        self._set_shared(key, value, ttl)
+
+    async def aset(self, key, value, ttl=None):
+        """set(), visible in this worker at once and written to SQLite in a thread"""
+        ttl = self.ttl if ttl is None else ttl
+        self.local.set(key, value, ttl=min(self.local_ttl, ttl))
+        await asyncio.to_thread(self._set_shared, key, value, ttl)
+
+    def _set_shared(self, key, value, ttl):
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl),
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                self._prune()
+
+    def _prune(self):
+        self._db.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (time.time() - self.keep_stale,))
+        self._db.execute(
+            f"DELETE FROM {self._table} WHERE key IN ("
+            f"SELECT key FROM {self._table} ORDER BY expires_at LIMIT max(0, (SELECT count(*) FROM {self._table}) - ?))",
+            (self.max_rows,),
+        )
+
+    def invalidate(self, key):
+        """Drop a single entry for every worker; returns True if it was present"""
+        present = self.local.invalidate(key)
+        return self._invalidate_shared(key) or present
+
+    async def ainvalidate(self, key):
+        present = self.local.invalidate(key)
+        return await asyncio.to_thread(self._invalidate_shared, key) or present
+
+    def _invalidate_shared(self, key):
+        if self._db is None:
+            return False
+        with self._lock:
+            return self._db.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,)).rowcount > 0
+
+    def clear(self):
+        self.local.clear()
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self._table}")
+
+    def __len__(self):
+        return len(self.local)
+
+    def __contains__(self, key):
+        return key in self.local or self.get(key) is not None
+
+    def stats(self):
+        return {
+            "size": len(self.local),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
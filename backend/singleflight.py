@@ -0,0 +1,34 @@
+import asyncio
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key onto one in-flight coroutine
+
+    The shared call runs as its own task, so a caller that disconnects or is
+    cancelled does not cancel the work the other waiters depend on. Results
+    and exceptions (timeouts included) are delivered to every waiter.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._flights)
+
+    async def do(self, key, fn, *args):
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # Mark the exception retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
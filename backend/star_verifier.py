@@ -0,0 +1,86 @@
+from cache import TTLCache
+from github_api import RateLimitExhausted
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+REPO_OWNER = "sanatanisher01"
+REPO_NAME = "Healthcare-symptoms"
+
+STARRED = "starred"
+NOT_STARRED = "not_starred"
+USER_NOT_FOUND = "user_not_found"
+RATE_LIMITED = "rate_limited"
+ERROR = "error"
+
+
+class StarVerifier:
+    """Resolves GitHub star status for a username, caching definitive answers
+
+    `cache` may be any TTLCache-compatible object (e.g. a SharedTTLCache so
+    worker processes share answers); by default a private TTLCache is used.
+    """
+
+    def __init__(self, github, maxsize=10000,
+                 ttl_positive=3600, ttl_negative=60, ttl_not_found=600, stargazers=None, cache=None):
+        self.github = github
+        self.stargazers = stargazers
+        self.ttls = {STARRED: ttl_positive, NOT_STARRED: ttl_negative, USER_NOT_FOUND: ttl_not_found}
+        self.cache = cache if cache is not None else TTLCache(maxsize=maxsize, ttl=ttl_positive)
+
+    async def invalidate(self, username):
+        """Forget any cached verification result for username"""
+        return await self.cache.ainvalidate(username.lower())
+
+    async def check(self, username, refresh_negative=False):
+        """Return (status, upstream_status_code); status_code is None for cache hits
+
+        status is one of STARRED, NOT_STARRED, USER_NOT_FOUND, RATE_LIMITED or ERROR.
+        Raises httpx exceptions on transport failures so callers can map them.
+        """
+        key = username.lower()
+        # Synced stargazer set answers known stars without touching the API
+        if self.stargazers is not None and key in self.stargazers:
+            return STARRED, None
+
+        cached = await self.cache.aget(key)
+        if cached is not None and not (refresh_negative and cached != STARRED):
+            return cached, None
+
+        try:
+            status, status_code = await self._lookup(username)
+        except RateLimitExhausted:
+            status, status_code = RATE_LIMITED, 403
+        if status == RATE_LIMITED:
+            # Out of quota: an expired answer beats refusing the user outright
+            stale = await self.cache.aget_stale(key)
+            if stale is not None:
+                return stale, None
+        if status in self.ttls:
+            await self.cache.aset(key, status, ttl=self.ttls[status])
+        if status == STARRED and self.stargazers is not None:
+            self.stargazers.add(key)
+        return status, status_code
+
+    async def _lookup(self, username):
+        github = self.github
+
+        # A 204 here proves both that the user exists and that they starred the repo
+        star_response = await github.get(f"/users/{username}/starred/{REPO_OWNER}/{REPO_NAME}")
+        log.debug("star_lookup", username=username, status=star_response.status_code, rate_limit_remaining=github.remaining)
+
+        if star_response.status_code == 204:
+            return STARRED, 204
+        if star_response.status_code == 403:
+            return RATE_LIMITED, 403
+        if star_response.status_code != 404:
+            return ERROR, star_response.status_code
+
+        # 404 is ambiguous: distinguish an unknown user from a missing star
+        user_response = await github.get(f"/users/{username}")
+        log.debug("user_lookup", username=username, status=user_response.status_code)
+        if user_response.status_code == 404:
+            return USER_NOT_FOUND, 404
+        if user_response.status_code == 200:
+            return NOT_STARRED, 404
+        return (RATE_LIMITED if user_response.status_code == 403 else ERROR), user_response.status_code
@@ -0,0 +1,85 @@
+import asyncio
+import sys
+
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+PER_PAGE = 100
+
+
+class StargazerSync:
+    """In-memory set of the repository's stargazers, refreshed by a background task
+
+    GitHub returns stargazers oldest first, so an incremental refresh resumes
+    from the last partially filled page. Unstars are only noticed by the
+    periodic full resync.
+    """
+
+    def __init__(self, github, owner, repo, interval=300, full_resync_every=12):
+        self.github = github
+        self.owner = owner
+        self.repo = repo
+        self.interval = interval
+        self.full_resync_every = full_resync_every
+        self.ready = False
+        self.last_synced = None
+        self._usernames = set()
+        self._next_page = 1
+        self._syncs = 0
+        self._task = None
+
+    def __contains__(self, username):
+        return username.lower() in self._usernames
+
+    def __len__(self):
+        return len(self._usernames)
+
+    def add(self, username):
+        """Record a star confirmed by a per-user lookup before the next sync sees it"""
+        self._usernames.add(username.lower())
+
+    async def sync(self, full=False):
+        """Fetch new stargazer pages (or every page when full) and merge them in"""
+        page = 1 if full else self._next_page
+        seen = set() if full else self._usernames
+        url = f"/repos/{self.owner}/{self.repo}/stargazers"
+        while True:
+            # Unchanged pages come back as free 304 revalidations
+            response = await self.github.get(url, params={"per_page": PER_PAGE, "page": page})
+            response.raise_for_status()
+            batch = response.json()
+            seen.update(sys.intern(user["login"].lower()) for user in batch)
+            if len(batch) < PER_PAGE:
+                break
+            page += 1
+        # Resume from the last page next time; it may have gained entries
+        self._next_page = page
+        self._usernames = seen
+        self._syncs += 1
+        self.last_synced = asyncio.get_running_loop().time()
+        self.ready = True
+        log.info("stargazer_sync", users=len(self._usernames), page=page)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync(full=self.ready and self._syncs % self.full_resync_every == 0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("stargazer_sync_failed", error=str(e))
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
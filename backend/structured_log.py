@@ -0,0 +1,184 @@
+"""Queue-backed structured JSON logging
+
+Callers only build a LogRecord and put it on a bounded queue; a single
+listener thread does the JSON encoding and all the writes. When the queue
+is full records are dropped and counted rather than blocking the event loop.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+
+# Correlation ID of the HTTP request being served, if any
+request_id = contextvars.ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# httpx logs every request URL at INFO, and Gemini URLs carry the API key
+QUIET_LOGGERS = ("httpx", "httpcore")
+
+
+class EventLogger:
+    """Logs an event name plus keyword fields: log.info("gemini_response", status=200)"""
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level, event, fields, exc_info=False):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, exc_info=False, **fields):
+        self._log(logging.ERROR, event, fields, exc_info)
+
+    def body(self, event, body, level=logging.DEBUG, **fields):
+        """Log a verbose upstream body, subject to the pipeline's sampling rate and size cap"""
+        pipeline = LogPipeline.active
+        if pipeline is None or not self._logger.isEnabledFor(level) or not pipeline.sample_body():
+            return
+        fields["body"] = body[:pipeline.body_max_chars]
+        self._log(level, event, fields)
+
+
+def get_logger(name):
+    return EventLogger(name)
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; fields named in `redact` are masked or hashed"""
+
+    def __init__(self, redact=(), redact_mode="mask"):
+        super().__init__()
+        self.redact = frozenset(redact)
+        self.redact_mode = redact_mode
+
+    def _redacted(self, value):
+        text = str(value)
+        if self.redact_mode == "hash":
+            # Stable across records, so repeats can still be correlated
+            return "sha256:" + hashlib.sha256(text.encode()).hexdigest()[:12]
+        return f"[redacted {len(text)} chars]"
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in getattr(record, "fields", {}).items():
+            entry[key] = self._redacted(value) if key in self.redact and value is not None else value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that snapshots the correlation ID and never blocks or writes"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread; only capture caller context here
+        record.request_id = request_id.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Routes the root logger through a bounded queue to one writer thread"""
+
+    active = None
+
+    def __init__(self, level="INFO", queue_size=10000, redact=("symptoms", "body"), redact_mode="mask",
+                 body_sample_rate=0.0, body_max_chars=500, stream=None):
+        self.level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+        self.body_sample_rate = body_sample_rate
+        self.body_max_chars = body_max_chars
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = _EnqueueHandler(self.queue)
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JSONFormatter(redact, redact_mode))
+        self.listener = logging.handlers.QueueListener(self.queue, output, respect_handler_level=False)
+        self._started = False
+
+    @property
+    def dropped(self):
+        return self.handler.dropped
+
+    def sample_body(self):
+        return self.body_sample_rate > 0 and random.random() < self.body_sample_rate
+
+    def start(self):
+        if self._started:
+            return
+        root = logging.getLogger()
+        root.handlers = [self.handler]
+        root.setLevel(self.level)
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(max(logging.WARNING, self.level))
+        self.listener.start()
+        self._started = True
+        LogPipeline.active = self
+
+    def stop(self):
+        """Flush everything queued so far and stop the writer thread"""
+        if self._started:
+            self.listener.stop()
+            self._started = False
+
+
+class CorrelationMiddleware:
+    """Pure ASGI middleware giving each request a correlation ID
+
+    A well-formed incoming X-Request-ID is reused, otherwise a new one is
+    generated; either way it is echoed on the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        current = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        token = request_id.set(current)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, current.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,118 @@
+import json
+import os
+import re
+
+import numpy as np
+
+DEFAULT_KNOWLEDGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "symptom_knowledge.json")
+
+AGE_GROUPS = ("Child", "Teen", "Adult", "Senior")
+GENDERS = ("Male", "Female", "Other")
+URGENCY_RANK = {"emergency": 0, "urgent": 1, "routine": 2}
+
+MAX_DIAGNOSES = 3
+MAX_RECOMMENDATIONS = 4
+
+
+class SymptomEngine:
+    """Offline symptom -> condition ranking over a bundled knowledge table
+
+    Free text is matched against every known symptom term and synonym with
+    one compiled regex. The inverted index is a term-major weight matrix:
+    row t holds every condition's weight for term t, so scoring is one NumPy
+    gather of the matched rows and a column sum. Each condition's weights
+    are normalised to sum to 1, so a score is the share of that condition's
+    symptom profile that is present, scaled by age-group and gender priors.
+    """
+
+    def __init__(self, knowledge):
+        conditions = knowledge["conditions"]
+        self.names = [condition["name"] for condition in conditions]
+        self.urgency = [URGENCY_RANK[condition.get("urgency", "routine")] for condition in conditions]
+        self.recommendations = [condition["recommendations"] for condition in conditions]
+
+        self.terms = sorted({term for condition in conditions for term in condition["symptoms"]})
+        term_ids = {term: index for index, term in enumerate(self.terms)}
+
+        weights = np.zeros((len(conditions), len(self.terms)), dtype=np.float32)
+        for row, condition in enumerate(conditions):
+            for term, weight in condition["symptoms"].items():
+                weights[row, term_ids[term]] = weight
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        # Inverted index: term id -> weight of that term in every condition
+        self.index = np.ascontiguousarray(weights.T)
+        self.age_prior = {
+            group: np.array([condition.get("age", {}).get(group, 1.0) for condition in conditions], dtype=np.float32)
+            for group in AGE_GROUPS
+        }
+        self.gender_prior = {
+            gender: np.array([condition.get("gender", {}).get(gender, 1.0) for condition in conditions], dtype=np.float32)
+            for gender in GENDERS
+        }
+
+        # Every surface form (canonical term or synonym) resolves to a term id
+        self.aliases = dict(term_ids)
+        for alias, term in knowledge.get("synonyms", {}).items():
+            if term in term_ids:
+                self.aliases[alias] = term_ids[term]
+        alternatives = "|".join(re.escape(alias) for alias in sorted(self.aliases, key=len, reverse=True))
+        self._pattern = re.compile(rf"(?P<negation>\b(?:no|not|without)\s+)?\b(?P<term>{alternatives})\b")
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_KNOWLEDGE_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def match_terms(self, symptoms: str):
+        """Sorted unique term ids mentioned (and not negated) in free text"""
+        found = {
+            self.aliases[match.group("term")]
+            for match in self._pattern.finditer(symptoms.lower())
+            if not match.group("negation")
+        }
+        return np.fromiter(sorted(found), dtype=np.intp, count=len(found))
+
+    def score(self, term_ids, age_group: str = "", gender: str = ""):
+        """(candidate condition ids, scores) for the given term ids, unsorted"""
+        if not len(term_ids):
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        scores = self.index[term_ids].sum(axis=0)
+        if age_group in self.age_prior:
+            scores *= self.age_prior[age_group]
+        if gender in self.gender_prior:
+            scores *= self.gender_prior[gender]
+        candidates = np.flatnonzero(scores)
+        return candidates, scores[candidates]
+
+    def analyze(self, symptoms: str, age_group: str = "", gender: str = ""):
+        """Return (result, confidence), or (None, 0.0) when no known symptom is mentioned
+
+        result has the /check-symptoms response shape; confidence is the top
+        condition's score.
+        """
+        candidates, scores = self.score(self.match_terms(symptoms), age_group.title(), gender.title())
+        if not len(candidates):
+            return None, 0.0
+
+        order = np.argsort(-scores, kind="stable")[:MAX_DIAGNOSES]
+        ranked = candidates[order].tolist()
+        ranked_scores = scores[order].tolist()
+        top_score = ranked_scores[0]
+
+        # Advice from serious conditions goes first, if they scored close to the leader
+        advice_order = sorted(
+            range(len(ranked)),
+            key=lambda i: (self.urgency[ranked[i]] if ranked_scores[i] >= 0.5 * top_score else 3, i),
+        )
+        recommendations = []
+        for i in advice_order:
+            for recommendation in self.recommendations[ranked[i]]:
+                if recommendation not in recommendations:
+                    recommendations.append(recommendation)
+
+        return {
+            "diagnoses": [self.names[condition] for condition in ranked],
+            "recommendations": recommendations[:MAX_RECOMMENDATIONS],
+            "source": "Offline Symptom Engine"
+        }, top_score
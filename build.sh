@@ -7,4 +7,5 @@ cd ../backend
 python3 -m venv venv
 source venv/bin/activate
 pip install --upgrade pip
-pip install -r requirements.txt
\ No newline at end of file
+pip install -r requirements.txt
+python precompress.py ../frontend/dist
\ No newline at end of file